@@ -9,7 +9,7 @@ import json
 import uuid
 from pathlib import Path
 
-from services.remote_debug import remote_debugger
+from services.remote_debug import remote_debugger, send_message
 from core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -24,6 +24,8 @@ def create_debug_router() -> APIRouter:
         logger.warning("Debug routes disabled in production")
         return router
     
+    router.add_event_handler("shutdown", remote_debugger.close)
+    
     @router.get("/")
     async def debug_dashboard():
         """Serve the debug dashboard"""
@@ -57,7 +59,7 @@ def create_debug_router() -> APIRouter:
                             session_id, command, params
                         )
                         
-                        await websocket.send_json({
+                        await send_message(websocket, {
                             "type": "command_result",
                             "command": command,
                             "result": result
@@ -67,7 +69,7 @@ def create_debug_router() -> APIRouter:
                     break
                 except Exception as e:
                     logger.error(f"Error handling debug WebSocket message: {e}")
-                    await websocket.send_json({
+                    await send_message(websocket, {
                         "type": "error",
                         "data": {"message": str(e)}
                     })
@@ -6,6 +6,7 @@ from pydantic import BaseModel, Field
 import logging
 from typing import Optional, Dict, Any
 import asyncio
+import functools
 import io
 
 from core.ai_client import AIClient
@@ -300,12 +301,18 @@ def create_conversation_router(audio_manager: AudioManager, database=None, webso
     return router
 
 
+@functools.lru_cache(maxsize=1)
+def _get_openai_client():
+    """Shared OpenAI client for TTS/STT, so requests reuse its connection pool"""
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=settings.openai_api_key)
+
+
 async def _text_to_speech(text: str) -> bytes:
     """Convert text to speech using OpenAI TTS API"""
     try:
-        from openai import AsyncOpenAI
-
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
+        client = _get_openai_client()
 
         # Use alloy voice - friendly and suitable for children
         response = await client.audio.speech.create(
@@ -338,11 +345,10 @@ async def _text_to_speech(text: str) -> bytes:
 async def _speech_to_text(audio_data: bytes) -> str:
     """Convert speech to text using OpenAI Whisper API"""
     try:
-        from openai import AsyncOpenAI
         import tempfile
         import os
 
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
+        client = _get_openai_client()
 
         # Write audio to temporary file (Whisper API requires file)
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
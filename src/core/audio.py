@@ -5,6 +5,7 @@ import asyncio
 import logging
 import os
 import io
+import time
 import wave
 from abc import ABC, abstractmethod
 from typing import Optional, Callable
@@ -256,6 +257,9 @@ class AudioManager:
         self.device: Optional[AudioInterface] = None
         self.button_callback: Optional[Callable] = None
         self.push_to_talk = None
+        # Called on every record/play (e.g. to wake a backed-off health monitor)
+        self.activity_callback: Optional[Callable[[], None]] = None
+        self._last_activity = time.monotonic()
 
     async def initialize(self) -> bool:
         """Initialize the appropriate audio device"""
@@ -304,14 +308,25 @@ class AudioManager:
         """Record audio from the current device"""
         if not self.device:
             raise RuntimeError("Audio device not initialized")
+        self._mark_activity()
         return await self.device.record(duration)
 
     async def play_audio(self, audio_data: bytes) -> None:
         """Play audio through the current device"""
         if not self.device:
             raise RuntimeError("Audio device not initialized")
+        self._mark_activity()
         await self.device.play(audio_data)
 
+    def _mark_activity(self) -> None:
+        self._last_activity = time.monotonic()
+        if self.activity_callback:
+            self.activity_callback()
+
+    def idle_seconds(self) -> float:
+        """Seconds since the last record or play call"""
+        return time.monotonic() - self._last_activity
+
     async def is_device_available(self) -> bool:
         """Check if current device is available"""
         if not self.device:
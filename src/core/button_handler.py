@@ -6,60 +6,83 @@ This module monitors that button for push-to-talk functionality.
 """
 import asyncio
 import logging
+import struct
 from typing import Callable, Optional
 from pathlib import Path
 
+try:
+    import evdev
+except ImportError:
+    evdev = None
+
 logger = logging.getLogger(__name__)
 
+# Resolved once so the per-event path avoids evdev.ecodes attribute lookups
+EV_KEY = evdev.ecodes.EV_KEY if evdev else 1
+KEY_UP = 0
+KEY_DOWN = 1
+
 
 class ButtonHandler:
     """Handles button events from USB audio devices"""
 
+    __slots__ = ('device', 'running', 'on_button_press', 'on_button_release', '_loop', '_callback_tasks')
+
     def __init__(self):
         self.device = None
         self.running = False
         self.on_button_press: Optional[Callable] = None
         self.on_button_release: Optional[Callable] = None
-        self._monitor_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Running async callbacks; referenced so they are not garbage-collected
+        self._callback_tasks: set = set()
 
     async def find_device(self) -> bool:
         """Find the PowerConf S330 input device"""
-        try:
-            import evdev
-
-            devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
+        if evdev is None:
+            logger.error("evdev not installed - button detection unavailable")
+            return False
 
-            for device in devices:
+        fallback = None
+        try:
+            # Single pass: a PowerConf/Anker device wins immediately, the first
+            # generic USB audio button device is kept as a fallback and every
+            # other device is closed right away
+            for path in evdev.list_devices():
+                device = evdev.InputDevice(path)
                 device_name = device.name.lower()
-                logger.debug(f"Found input device: {device.name}")
+                logger.debug("Found input device: %s", device.name)
 
                 # Look for Anker PowerConf or S330
                 if 'powerconf' in device_name or 's330' in device_name or 'anker' in device_name:
+                    if fallback is not None:
+                        fallback.close()
                     self.device = device
                     logger.info(f"Found PowerConf S330 button device: {device.name} at {device.path}")
                     return True
 
-            # Also check for generic USB audio controller buttons
-            for device in devices:
-                caps = device.capabilities()
-                # Look for devices with KEY events (buttons)
-                if 1 in caps:  # EV_KEY
-                    keys = caps[1]
+                # Also check for generic USB audio controller buttons
+                if fallback is None and ('audio' in device_name or 'usb' in device_name):
+                    # Only fetch EV_KEY capabilities (buttons)
+                    keys = device.capabilities().get(EV_KEY, ())
                     # Check for mute key (113) or other media keys
                     if 113 in keys or 163 in keys:  # KEY_MUTE or KEY_NEXTSONG
-                        device_name = device.name.lower()
-                        if 'audio' in device_name or 'usb' in device_name:
-                            self.device = device
-                            logger.info(f"Found USB audio button device: {device.name}")
-                            return True
+                        fallback = device
+                        continue
+
+                device.close()
+
+            if fallback is not None:
+                self.device = fallback
+                logger.info(f"Found USB audio button device: {fallback.name}")
+                return True
 
             logger.warning("No PowerConf S330 button device found")
             return False
 
-        except ImportError:
-            logger.error("evdev not installed - button detection unavailable")
-            return False
         except Exception as e:
+            if fallback is not None and fallback is not self.device:
+                fallback.close()
             logger.error(f"Error finding button device: {e}")
             return False
 
@@ -70,50 +93,68 @@ class ButtonHandler:
                 return False
 
         self.running = True
-        self._monitor_task = asyncio.create_task(self._monitor_loop())
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.device.fd, self._on_fd_ready)
         logger.info("Button monitoring started")
         return True
 
-    async def _monitor_loop(self):
-        """Main monitoring loop for button events"""
+    def _on_fd_ready(self):
+        """Drain every pending event from the device on each wakeup"""
         try:
-            import evdev
-
-            async for event in self.device.async_read_loop():
+            for event in self.device.read():
                 if not self.running:
                     break
-
-                # EV_KEY events (button press/release)
-                if event.type == evdev.ecodes.EV_KEY:
-                    key_event = evdev.categorize(event)
-
-                    logger.debug(f"Button event: {key_event.keycode} state={key_event.keystate}")
-
-                    # keystate: 0=release, 1=press, 2=hold
-                    if key_event.keystate == 1:  # Press
-                        logger.info(f"Button pressed: {key_event.keycode}")
-                        if self.on_button_press:
-                            await self._safe_callback(self.on_button_press)
-
-                    elif key_event.keystate == 0:  # Release
-                        logger.info(f"Button released: {key_event.keycode}")
-                        if self.on_button_release:
-                            await self._safe_callback(self.on_button_release)
-
-        except asyncio.CancelledError:
-            logger.info("Button monitoring cancelled")
+                self._dispatch(event)
+        except BlockingIOError:
+            pass  # Kernel queue drained
         except Exception as e:
             logger.error(f"Button monitoring error: {e}")
-
-    async def _safe_callback(self, callback: Callable):
-        """Safely execute a callback (sync or async)"""
+            self._remove_reader()
+
+    def _dispatch(self, event):
+        """Handle a single input event"""
+        # EV_KEY events (button press/release)
+        if event.type == EV_KEY:
+            # categorize() allocates a KeyEvent that is only needed for logging
+            if logger.isEnabledFor(logging.DEBUG):
+                key_event = evdev.categorize(event)
+                logger.debug("Button event: %s state=%s", key_event.keycode, key_event.keystate)
+
+            # value: 0=release, 1=press, 2=hold
+            if event.value == KEY_DOWN:  # Press
+                logger.info("Button pressed: %s", event.code)
+                if self.on_button_press:
+                    self._safe_callback(self.on_button_press)
+
+            elif event.value == KEY_UP:  # Release
+                logger.info("Button released: %s", event.code)
+                if self.on_button_release:
+                    self._safe_callback(self.on_button_release)
+
+    def _safe_callback(self, callback: Callable):
+        """Safely execute a callback (sync, or async scheduled as a task)"""
         try:
             result = callback()
             if asyncio.iscoroutine(result):
-                await result
+                task = asyncio.ensure_future(self._await_callback(result))
+                self._callback_tasks.add(task)
+                task.add_done_callback(self._callback_tasks.discard)
+        except Exception as e:
+            logger.error(f"Button callback error: {e}")
+
+    async def _await_callback(self, coro):
+        """Await an async callback, logging instead of raising errors"""
+        try:
+            await coro
         except Exception as e:
             logger.error(f"Button callback error: {e}")
 
+    def _remove_reader(self):
+        """Stop watching the device file descriptor"""
+        if self._loop and self.device:
+            self._loop.remove_reader(self.device.fd)
+        self._loop = None
+
     def set_callbacks(self, on_press: Optional[Callable] = None,
                       on_release: Optional[Callable] = None):
         """Set button press/release callbacks"""
@@ -123,12 +164,9 @@ class ButtonHandler:
     async def stop(self):
         """Stop monitoring button events"""
         self.running = False
-        if self._monitor_task:
-            self._monitor_task.cancel()
-            try:
-                await self._monitor_task
-            except asyncio.CancelledError:
-                pass
+        self._remove_reader()
+        for task in list(self._callback_tasks):
+            task.cancel()
         if self.device:
             self.device.close()
             self.device = None
@@ -149,6 +187,15 @@ class PushToTalkController:
     - Release: Stop recording and process speech
     """
 
+    __slots__ = (
+        'audio_manager', 'button_handler', 'is_recording', 'recording_task',
+        'on_conversation', 'recorded_audio', '_edge_queue',
+        '_pcm_buffer', '_pcm_pos', '_wav_header',
+    )
+
+    # Safety limit for a single push-to-talk recording
+    MAX_RECORDING_SECONDS = 30
+
     def __init__(self, audio_manager):
         self.audio_manager = audio_manager
         self.button_handler = ButtonHandler()
@@ -156,8 +203,13 @@ class PushToTalkController:
         self.recording_task: Optional[asyncio.Task] = None
         self.on_conversation: Optional[Callable] = None
         self.recorded_audio: bytes = b''
-        self._record_start_event = asyncio.Event()
-        self._record_stop_event = asyncio.Event()
+        # Button edges ('start'/'stop') consumed by the single recording task
+        self._edge_queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+
+        # Preallocated 16-bit mono PCM buffer, reused across recordings
+        self._pcm_buffer = bytearray(audio_manager.sample_rate * 2 * self.MAX_RECORDING_SECONDS)
+        self._pcm_pos = 0
+        self._wav_header: bytes = b''
 
     def set_conversation_callback(self, callback: Callable):
         """Set callback for when recording completes: callback(audio_bytes)"""
@@ -171,6 +223,7 @@ class PushToTalkController:
         )
 
         if await self.button_handler.start_monitoring():
+            self.recording_task = asyncio.create_task(self._consume_edges())
             logger.info("Push-to-talk controller started")
             return True
         else:
@@ -179,52 +232,63 @@ class PushToTalkController:
 
     def _on_button_press(self):
         """Handle button press - start recording"""
-        if not self.is_recording:
-            logger.info("Push-to-talk: Starting recording")
-            self.is_recording = True
-            self._record_start_event.set()
-            self.recording_task = asyncio.create_task(self._record_audio())
+        self._push_edge('start')
 
     def _on_button_release(self):
         """Handle button release - stop recording"""
-        if self.is_recording:
-            logger.info("Push-to-talk: Stopping recording")
-            self.is_recording = False
-            self._record_stop_event.set()
+        self._push_edge('stop')
+
+    def _push_edge(self, token: str):
+        """Queue a button edge for the recording task"""
+        try:
+            self._edge_queue.put_nowait(token)
+        except asyncio.QueueFull:
+            logger.warning("Push-to-talk: dropping '%s' edge, queue full", token)
+
+    async def _consume_edges(self):
+        """Turn queued button edges into recordings (one long-lived task)"""
+        while True:
+            token = await self._edge_queue.get()
+            if token == 'start':
+                await self._record_audio()
+
+    def _stop_requested(self) -> bool:
+        """Consume queued edges up to and including the next 'stop'"""
+        while not self._edge_queue.empty():
+            if self._edge_queue.get_nowait() == 'stop':
+                return True
+        return False
 
     async def _record_audio(self):
         """Record audio while button is held"""
+        logger.info("Push-to-talk: Starting recording")
+        self.is_recording = True
         try:
-            self._record_stop_event.clear()
-            chunks = []
+            self._pcm_pos = 0
+            self._wav_header = b''
 
             # Record in small chunks until button is released
-            while self.is_recording:
-                try:
-                    # Record 0.5 second chunks
-                    chunk = await asyncio.wait_for(
-                        self.audio_manager.record_audio(duration=0.5),
-                        timeout=1.0
-                    )
-                    chunks.append(chunk)
-                except asyncio.TimeoutError:
-                    continue
-
+            while True:
                 # Check if we should stop
-                if self._record_stop_event.is_set():
+                if self._stop_requested():
+                    logger.info("Push-to-talk: Stopping recording")
                     break
 
+                # Record 0.5 second chunks; the device bounds each call by
+                # its duration, so no extra timeout wrapper is needed
+                chunk = await self.audio_manager.record_audio(duration=0.5)
+
                 # Safety limit: max 30 seconds
-                if len(chunks) >= 60:
+                if not self._append_chunk(chunk):
                     logger.warning("Recording reached 30 second limit")
                     break
 
-            # Combine audio chunks
-            if chunks:
-                self.recorded_audio = self._combine_wav_chunks(chunks)
-                logger.info(f"Recording complete: {len(self.recorded_audio)} bytes")
+            # Wrap the buffered PCM in a single WAV
+            if self._pcm_pos:
+                self.recorded_audio = self._build_wav()
+                logger.info("Recording complete: %d bytes", len(self.recorded_audio))
 
-                # Trigger callback
+                # Trigger callback; awaited so conversations never overlap
                 if self.on_conversation and self.recorded_audio:
                     await self._safe_callback(self.on_conversation, self.recorded_audio)
 
@@ -232,36 +296,33 @@ class PushToTalkController:
             logger.error(f"Recording error: {e}")
         finally:
             self.is_recording = False
-            self._record_start_event.clear()
-
-    def _combine_wav_chunks(self, chunks: list) -> bytes:
-        """Combine multiple WAV chunks into a single WAV file"""
-        import wave
-        import io
-
-        if not chunks:
-            return b''
-
-        # Read first chunk to get parameters
-        first_chunk = io.BytesIO(chunks[0])
-        with wave.open(first_chunk, 'rb') as wav:
-            params = wav.getparams()
-
-        # Extract raw audio data from each chunk
-        all_frames = []
-        for chunk in chunks:
-            chunk_buffer = io.BytesIO(chunk)
-            with wave.open(chunk_buffer, 'rb') as wav:
-                all_frames.append(wav.readframes(wav.getnframes()))
-
-        # Create combined WAV
-        output = io.BytesIO()
-        with wave.open(output, 'wb') as wav:
-            wav.setparams(params)
-            wav.writeframes(b''.join(all_frames))
-
-        output.seek(0)
-        return output.getvalue()
+
+    def _append_chunk(self, chunk: bytes) -> bool:
+        """Copy a WAV chunk's PCM payload into the recording buffer
+
+        Returns False once the buffer is full; any overflow is dropped.
+        """
+        header_len = chunk.index(b'data', 12) + 8
+        if not self._wav_header:
+            self._wav_header = chunk[:header_len]
+
+        pcm = memoryview(chunk)[header_len:]
+        end = min(self._pcm_pos + len(pcm), len(self._pcm_buffer))
+        self._pcm_buffer[self._pcm_pos:end] = pcm[:end - self._pcm_pos]
+        self._pcm_pos = end
+        return end < len(self._pcm_buffer)
+
+    def _build_wav(self) -> bytes:
+        """Wrap the buffered PCM in the first chunk's header with patched sizes"""
+        header_len = len(self._wav_header)
+        output = bytearray(header_len + self._pcm_pos)
+        output[:header_len] = self._wav_header
+        output[header_len:] = memoryview(self._pcm_buffer)[:self._pcm_pos]
+
+        # RIFF chunk size and data subchunk size
+        struct.pack_into('<I', output, 4, len(output) - 8)
+        struct.pack_into('<I', output, header_len - 4, self._pcm_pos)
+        return bytes(output)
 
     async def _safe_callback(self, callback: Callable, *args):
         """Safely execute a callback"""
@@ -1,72 +1,130 @@
 """
 Configuration management for heyBuddy
 """
+import functools
 import os
 import yaml
+from dataclasses import dataclass, fields, MISSING
 from pathlib import Path
-from pydantic import Field
-from pydantic_settings import BaseSettings
-from typing import Optional
+from dotenv import dotenv_values
+from typing import Any, Dict, Optional
 
+try:
+    from yaml import CSafeLoader as SafeLoader  # LibYAML C parser
+except ImportError:
+    from yaml import SafeLoader
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Settings:
+    """Read-only application settings, populated once from the environment.
+
+    Each field is read from the upper-cased environment variable of the same
+    name (e.g. ``api_port`` from ``API_PORT``).
+    """
 
-class Settings(BaseSettings):
     # Application settings
     app_name: str = "heyBuddy"
     version: str = "0.1.0"
     debug: bool = False
-    environment: str = Field(default="development", env="ENVIRONMENT")
-    language: str = Field(default="de", env="LANGUAGE")  # "en" or "de"
-    
+    environment: str = "development"
+    language: str = "de"  # "en" or "de"
+
     # API settings
-    api_host: str = Field(default="0.0.0.0", env="API_HOST")
-    api_port: int = Field(default=8080, env="API_PORT")
-    secret_key: str = Field(..., env="SECRET_KEY")
-    
+    api_host: str = "0.0.0.0"
+    api_port: int = 8080
+    shutdown_timeout: int = 30  # seconds to drain connections on stop
+    secret_key: str
+
     # OpenAI settings
-    openai_api_key: str = Field(..., env="OPENAI_API_KEY")
-    openai_model: str = Field(default="gpt-4", env="OPENAI_MODEL")
-    openai_max_tokens: int = Field(default=150, env="OPENAI_MAX_TOKENS")
-    openai_temperature: float = Field(default=0.7, env="OPENAI_TEMPERATURE")
-    
+    openai_api_key: str
+    openai_model: str = "gpt-4"
+    openai_max_tokens: int = 150
+    openai_temperature: float = 0.7
+
     # Audio settings
-    audio_device: str = Field(default="auto", env="AUDIO_DEVICE")  # "auto", "mock", "powerconf"
-    sample_rate: int = Field(default=16000, env="SAMPLE_RATE")
-    chunk_size: int = Field(default=1024, env="CHUNK_SIZE")
-    
+    audio_device: str = "auto"  # "auto", "mock", "powerconf"
+    sample_rate: int = 16000
+    chunk_size: int = 1024
+
     # Database settings
-    database_url: str = Field(default="sqlite:///./data/heybuddy.db", env="DATABASE_URL")
-    
+    database_url: str = "sqlite:///./data/heybuddy.db"
+
     # Safety settings
-    enable_moderation: bool = Field(default=True, env="ENABLE_MODERATION")
-    max_conversation_length: int = Field(default=10, env="MAX_CONVERSATION_LENGTH")
-    conversation_timeout: int = Field(default=300, env="CONVERSATION_TIMEOUT")  # 5 minutes
-    
+    enable_moderation: bool = True
+    max_conversation_length: int = 10
+    conversation_timeout: int = 300  # 5 minutes
+
     # Systemd settings
-    enable_systemd_notify: bool = Field(default=False, env="ENABLE_SYSTEMD_NOTIFY")
-    health_check_interval: int = Field(default=30, env="HEALTH_CHECK_INTERVAL")
-    
+    enable_systemd_notify: bool = False
+    health_check_interval: int = 30  # while active or after a failure
+    health_check_interval_max: int = 240  # backed-off interval while idle and healthy
+
     # Logging
-    log_level: str = Field(default="INFO", env="LOG_LEVEL")
-    log_file: Optional[str] = Field(default=None, env="LOG_FILE")
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    log_level: str = "INFO"
+    log_file: Optional[str] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        overrides: Optional[Dict[str, Any]] = None,
+        dotenv: Optional[Dict[str, Optional[str]]] = None
+    ) -> "Settings":
+        """Build settings from environment variables, then overrides, then
+        ``.env`` values, then defaults"""
+        overrides = overrides or {}
+        dotenv = dotenv or {}
+        values = {}
+        for field in fields(cls):
+            raw = os.getenv(field.name.upper())
+            if raw is None:
+                raw = overrides.get(field.name)
+            if raw is None:
+                raw = dotenv.get(field.name.upper())
+            if raw is None:
+                if field.default is MISSING:
+                    raise ValueError(f"Missing required setting: {field.name.upper()}")
+                continue
+            values[field.name] = _coerce(field.type, raw) if isinstance(raw, str) else raw
+        return cls(**values)
+
+
+_TRUE_VALUES = {"1", "true", "yes", "on", "y", "t"}
+_FALSE_VALUES = {"0", "false", "no", "off", "n", "f"}
+
 
+def _coerce(field_type, raw: str):
+    """Convert an environment string to the field's declared type"""
+    if field_type is bool:
+        value = raw.strip().lower()
+        if value in _TRUE_VALUES:
+            return True
+        if value in _FALSE_VALUES:
+            return False
+        raise ValueError(f"Invalid boolean value: {raw!r}")
+    if field_type is int:
+        return int(raw)
+    if field_type is float:
+        return float(raw)
+    return raw
 
+
+@functools.lru_cache(maxsize=1)
 def load_config(config_file: Optional[str] = None) -> Settings:
     """Load configuration from file and environment variables"""
+    # Read without touching os.environ; .env ranks below the config file
+    dotenv = dotenv_values(".env", encoding="utf-8")
+
+    overrides = {}
     if config_file and Path(config_file).exists():
         with open(config_file, 'r') as f:
-            config_data = yaml.safe_load(f)
-        
-        # Override with environment variables
-        for key, value in config_data.items():
-            if not os.getenv(key.upper()):
-                os.environ[key.upper()] = str(value)
-    
-    return Settings()
+            config_data = yaml.load(f, Loader=SafeLoader) or {}
+
+        # File values apply only where no environment variable is set
+        overrides = {key.lower(): value for key, value in config_data.items()}
+
+    return Settings.from_env(overrides, dotenv)
 
 
 # Global configuration instance
-settings = load_config()
\ No newline at end of file
+settings = load_config()
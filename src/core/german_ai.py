@@ -2,8 +2,17 @@
 German AI Personality and Content Filtering for heyBuddy
 Provides German-language AI companion with cultural context and DSGVO compliance
 """
+import functools
+import itertools
 import logging
-from typing import Optional, Dict, Any, List
+import random
+import re
+from typing import Optional, Dict, Any, List, Tuple
+
+try:
+    import ahocorasick  # optional: pyahocorasick multi-pattern matcher
+except ImportError:
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +20,8 @@ logger = logging.getLogger(__name__)
 class GermanContentFilter:
     """German-specific content moderation and safety filtering"""
     
+    __slots__ = ()  # stateless; all keyword data lives on the class
+    
     # German blocked topics - cultural and age-appropriate filtering
     BLOCKED_TOPICS = [
         # Violence and inappropriate content
@@ -57,21 +68,20 @@ class GermanContentFilter:
         ]
     }
     
+    # Aho-Corasick automaton over all keyword lists, built once at import
+    # when pyahocorasick is available (see _build_keyword_automaton)
+    _automaton = None
+
     def check_content_appropriateness(self, content: str, age: Optional[int] = None) -> Dict[str, Any]:
         """Check if content is appropriate for German children"""
         content_lower = content.lower()
         
-        # Check for blocked topics
-        flagged_words = []
-        for topic in self.BLOCKED_TOPICS:
-            if topic.lower() in content_lower:
-                flagged_words.append(topic)
-        
-        # Check for emotional distress indicators
-        emotional_indicators = []
-        for keyword in self.EMOTIONAL_KEYWORDS:
-            if keyword.lower() in content_lower:
-                emotional_indicators.append(keyword)
+        if self._automaton is not None:
+            flagged_words, emotional_indicators = self._scan_automaton(content_lower)
+        else:
+            # Check for blocked topics and emotional distress indicators
+            flagged_words = _regex_hits(_BLOCKED_RE, _BLOCKED_TOPICS_LC, self.BLOCKED_TOPICS, content_lower)
+            emotional_indicators = _regex_hits(_EMOTIONAL_RE, _EMOTIONAL_KEYWORDS_LC, self.EMOTIONAL_KEYWORDS, content_lower)
         
         # Determine if content is safe
         is_safe = len(flagged_words) == 0
@@ -85,6 +95,18 @@ class GermanContentFilter:
             "age_appropriate": self._check_age_appropriateness(content, age)
         }
     
+    def _scan_automaton(self, content_lower: str) -> Tuple[List[str], List[str]]:
+        """Collect blocked and emotional keyword hits in one pass over the content"""
+        hits = {"blocked": set(), "emotional": set()}
+        for _end, (category, index) in self._automaton.iter(content_lower):
+            if category in hits:
+                hits[category].add(index)
+        
+        # Report keywords in list order, as the plain substring scan does
+        flagged_words = [self.BLOCKED_TOPICS[i] for i in sorted(hits["blocked"])]
+        emotional_indicators = [self.EMOTIONAL_KEYWORDS[i] for i in sorted(hits["emotional"])]
+        return flagged_words, emotional_indicators
+    
     def _check_age_appropriateness(self, content: str, age: Optional[int]) -> bool:
         """Check if content matches age-appropriate topics"""
         if not age:
@@ -92,25 +114,71 @@ class GermanContentFilter:
         
         content_lower = content.lower()
         
-        if age <= 6:
-            safe_topics = self.SAFE_TOPICS["young"]
-        else:
-            safe_topics = self.SAFE_TOPICS["young"] + self.SAFE_TOPICS["school"]
+        safe_topics_re = _SAFE_YOUNG_RE if age <= 6 else _SAFE_ALL_RE
         
         # If content mentions safe topics, it's likely appropriate
-        for topic in safe_topics:
-            if topic.lower() in content_lower:
-                return True
+        if safe_topics_re.search(content_lower):
+            return True
         
         # For simple conversational content, default to safe
-        simple_patterns = ["hallo", "wie geht", "was machst", "erzähl", "hilf mir"]
-        for pattern in simple_patterns:
-            if pattern in content_lower:
-                return True
+        if _SIMPLE_RE.search(content_lower):
+            return True
         
         return True  # Default to allowing, let other filters catch problems
 
 
+# Keyword lists are constants, so lowercase them once instead of per message
+_BLOCKED_TOPICS_LC = tuple(t.lower() for t in GermanContentFilter.BLOCKED_TOPICS)
+_EMOTIONAL_KEYWORDS_LC = tuple(k.lower() for k in GermanContentFilter.EMOTIONAL_KEYWORDS)
+_SAFE_TOPICS_YOUNG_LC = tuple(t.lower() for t in GermanContentFilter.SAFE_TOPICS["young"])
+_SAFE_TOPICS_SCHOOL_LC = tuple(t.lower() for t in GermanContentFilter.SAFE_TOPICS["school"])
+_SAFE_TOPICS_ALL_LC = _SAFE_TOPICS_YOUNG_LC + _SAFE_TOPICS_SCHOOL_LC
+_SIMPLE_PATTERNS = ("hallo", "wie geht", "was machst", "erzähl", "hilf mir")
+
+
+def _compile_alternation(keywords_lc, overlapping: bool = False) -> re.Pattern:
+    """Compile lowercased keywords into one alternation, longest first.
+
+    With ``overlapping`` the alternation is wrapped in a lookahead so findall
+    reports hits at every offset, e.g. both "selbstverletzung" and "verletzung".
+    """
+    alternation = "|".join(re.escape(k) for k in sorted(keywords_lc, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))" if overlapping else alternation)
+
+
+def _regex_hits(pattern: re.Pattern, keywords_lc, keywords, content_lower: str) -> List[str]:
+    """Return the original keywords matched by ``pattern``, in list order"""
+    found = set(pattern.findall(content_lower))
+    if not found:
+        return []
+    return [keyword for keyword, keyword_lc in zip(keywords, keywords_lc) if keyword_lc in found]
+
+
+_BLOCKED_RE = _compile_alternation(_BLOCKED_TOPICS_LC, overlapping=True)
+_EMOTIONAL_RE = _compile_alternation(_EMOTIONAL_KEYWORDS_LC, overlapping=True)
+_SAFE_YOUNG_RE = _compile_alternation(_SAFE_TOPICS_YOUNG_LC)
+_SAFE_ALL_RE = _compile_alternation(_SAFE_TOPICS_ALL_LC)
+_SIMPLE_RE = _compile_alternation(_SIMPLE_PATTERNS)
+
+
+def _build_keyword_automaton():
+    """Build a single Aho-Corasick automaton tagged with (category, list index)"""
+    automaton = ahocorasick.Automaton()
+    categories = {
+        "blocked": _BLOCKED_TOPICS_LC,
+        "emotional": _EMOTIONAL_KEYWORDS_LC,
+    }
+    for category, keywords in categories.items():
+        for index, keyword_lc in enumerate(keywords):
+            automaton.add_word(keyword_lc, (category, index))
+    automaton.make_automaton()
+    return automaton
+
+
+if ahocorasick is not None:
+    GermanContentFilter._automaton = _build_keyword_automaton()
+
+
 class GermanAIPersona:
     """German AI personality configurations with cultural context"""
     
@@ -127,10 +195,24 @@ class GermanAIPersona:
         "Hänschen klein", "Hoppe hoppe Reiter", "Schlaf Kindlein schlaf"
     ]
     
+    @staticmethod
+    def _age_bucket(age: Optional[int]) -> str:
+        """Bin an age into the prompt tiers: young (<=6), school (<=12) or general"""
+        if age and age <= 6:
+            return "young"
+        elif age and age <= 12:
+            return "school"
+        return "general"
+
     @staticmethod
     def get_german_system_prompt(age: Optional[int] = None, context: str = "general") -> str:
         """Generate German system prompt based on age and context"""
-        
+        return GermanAIPersona._system_prompt_for(GermanAIPersona._age_bucket(age))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def _system_prompt_for(bucket: str) -> str:
+        """Build the system prompt for an age bucket (cached, only three variants)"""
         base_prompt = """Du bist heyBuddy, ein freundlicher KI-Begleiter für deutsche Kinder. Du bist:
 
 - Warmherzig, geduldig und ermutigend
@@ -155,7 +237,7 @@ Deutsche Notfall-Kontakte für Kinder in Not:
 - Telefonseelsorge: 0800 111 0 111
 """
         
-        if age and age <= 6:
+        if bucket == "young":
             return base_prompt + """
 Zusätzliche Richtlinien für junge deutsche Kinder (4-6 Jahre):
 - Verwende sehr einfache deutsche Wörter und kurze Sätze
@@ -166,7 +248,7 @@ Zusätzliche Richtlinien für junge deutsche Kinder (4-6 Jahre):
 - Beispiele: "Wie die Bremer Stadtmusikanten zeigen uns, dass Freundschaft stark macht!"
 - Zähle gerne mit: "Eins, zwei, drei - du schaffst das!"
 """
-        elif age and age <= 12:
+        elif bucket == "school":
             return base_prompt + """
 Zusätzliche Richtlinien für deutsche Schulkinder (7-12 Jahre):
 - Verwende altersgerechten deutschen Wortschatz
@@ -180,13 +262,13 @@ Zusätzliche Richtlinien für deutsche Schulkinder (7-12 Jahre):
         else:
             return base_prompt
 
-    @staticmethod 
-    def get_emotional_support_prompt(emotional_keywords: List[str]) -> str:
-        """Generate supportive response for emotional distress in German"""
-        return f"""Das Kind zeigt emotionale Belastung durch die Wörter: {', '.join(emotional_keywords)}
+    # Fixed parts of the emotional support prompt; only the keywords vary
+    _EMOTIONAL_SUPPORT_HEAD = "Das Kind zeigt emotionale Belastung durch die Wörter: "
+    _EMOTIONAL_SUPPORT_MIDDLE = """
 
 Antworte mit:
-1. Verständnis zeigen: "Ich verstehe, dass du dich {emotional_keywords[0]} fühlst."
+1. Verständnis zeigen: "Ich verstehe, dass du dich """
+    _EMOTIONAL_SUPPORT_TAIL = """ fühlst."
 2. Ermutigung geben: "Diese Gefühle sind normal und gehen vorbei."  
 3. Positive Ablenkung: Schlage eine beruhigende Aktivität vor
 4. Erwachsenen-Hilfe: "Sprich mit Mama, Papa oder einem Lehrer darüber"
@@ -195,10 +277,23 @@ Antworte mit:
 Halte die Antwort kurz und beruhigend (max. 3 Sätze).
 """
 
+    @staticmethod 
+    def get_emotional_support_prompt(emotional_keywords: List[str]) -> str:
+        """Generate supportive response for emotional distress in German"""
+        return (GermanAIPersona._EMOTIONAL_SUPPORT_HEAD + ', '.join(emotional_keywords)
+                + GermanAIPersona._EMOTIONAL_SUPPORT_MIDDLE + emotional_keywords[0]
+                + GermanAIPersona._EMOTIONAL_SUPPORT_TAIL)
+
     @staticmethod
     def get_storytelling_prompt(theme: str, age: Optional[int] = None) -> str:
         """Generate German storytelling prompt"""
-        if age and age <= 6:
+        return GermanAIPersona._storytelling_prompt_for(theme, GermanAIPersona._age_bucket(age) == "young")
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _storytelling_prompt_for(theme: str, young: bool) -> str:
+        """Build the storytelling prompt for a theme (cached, themes repeat often)"""
+        if young:
             return f"""Erzähle eine sehr kurze deutsche Geschichte über {theme}.
             
 Richtlinien:
@@ -247,21 +342,37 @@ class GermanSafetyResponse:
         "Moment mal, das hat nicht geklappt. Aber wir schaffen das zusammen!"
     ]
     
+    # Pre-shuffled rotations give the same variety without an RNG call per response
+    _CYCLES = {
+        "inappropriate": itertools.cycle(random.sample(INAPPROPRIATE_CONTENT_RESPONSES, len(INAPPROPRIATE_CONTENT_RESPONSES))),
+        "emotional_support": itertools.cycle(random.sample(EMOTIONAL_SUPPORT_RESPONSES, len(EMOTIONAL_SUPPORT_RESPONSES))),
+        "encouragement": itertools.cycle(random.sample(ENCOURAGEMENT_RESPONSES, len(ENCOURAGEMENT_RESPONSES))),
+        "error": itertools.cycle(random.sample(ERROR_RESPONSES, len(ERROR_RESPONSES))),
+    }
+    
     @staticmethod
     def get_response(response_type: str, context: Dict[str, Any] = None) -> str:
         """Get appropriate German response based on situation"""
-        import random
-        
-        if response_type == "inappropriate":
-            return random.choice(GermanSafetyResponse.INAPPROPRIATE_CONTENT_RESPONSES)
-        elif response_type == "emotional_support":
-            return random.choice(GermanSafetyResponse.EMOTIONAL_SUPPORT_RESPONSES)
-        elif response_type == "encouragement":
-            return random.choice(GermanSafetyResponse.ENCOURAGEMENT_RESPONSES)
-        elif response_type == "error":
-            return random.choice(GermanSafetyResponse.ERROR_RESPONSES)
-        else:
+        cycle = GermanSafetyResponse._CYCLES.get(response_type)
+        if cycle is None:
             return "Ich bin für dich da! Was möchtest du besprechen?"
+        return next(cycle)
+
+
+# Topic keywords and their cultural references, in priority order
+_CULTURAL_RESPONSES = (
+    (("sport", "spiel"), "Wie beim Fußball - Übung macht den Meister!"),
+    (("essen", "hunger"), "Soll ich dir von deutschen Leckereien wie Lebkuchen erzählen?"),
+    (("reise", "urlaub"), "Deutschland hat so schöne Orte wie den Schwarzwald oder die Nordsee!"),
+    (("tradition", "fest"), "In Deutschland feiern wir tolle Feste wie Weihnachten und Ostern!"),
+)
+_CULTURAL_PRIORITY = {
+    keyword: priority
+    for priority, (keywords, _response) in enumerate(_CULTURAL_RESPONSES)
+    for keyword in keywords
+}
+# Lookahead so overlapping keywords ("reisessen") are all reported
+_CULTURAL_RE = re.compile(f"(?=({'|'.join(_CULTURAL_PRIORITY)}))")
 
 
 class GermanCulturalContext:
@@ -289,13 +400,8 @@ class GermanCulturalContext:
     @staticmethod
     def get_cultural_reference(topic: str) -> str:
         """Get appropriate German cultural reference for topic"""
-        if "sport" in topic.lower() or "spiel" in topic.lower():
-            return "Wie beim Fußball - Übung macht den Meister!"
-        elif "essen" in topic.lower() or "hunger" in topic.lower():
-            return "Soll ich dir von deutschen Leckereien wie Lebkuchen erzählen?"
-        elif "reise" in topic.lower() or "urlaub" in topic.lower():
-            return "Deutschland hat so schöne Orte wie den Schwarzwald oder die Nordsee!"
-        elif "tradition" in topic.lower() or "fest" in topic.lower():
-            return "In Deutschland feiern wir tolle Feste wie Weihnachten und Ostern!"
-        else:
-            return "Das erinnert mich an ein deutsches Märchen..."
\ No newline at end of file
+        matches = _CULTURAL_RE.findall(topic.lower())
+        if not matches:
+            return "Das erinnert mich an ein deutsches Märchen..."
+        _keywords, response = _CULTURAL_RESPONSES[min(_CULTURAL_PRIORITY[m] for m in matches)]
+        return response
@@ -1,11 +1,20 @@
 """
 Safety and content moderation utilities for heyBuddy
 """
+import functools
 import logging
 import asyncio
-from typing import Dict, List, Optional, Any
+import bisect
+import time
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import re
+from collections import Counter
+
+try:
+    import ahocorasick  # optional: pyahocorasick multi-pattern matcher
+except ImportError:
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
@@ -40,30 +49,22 @@ class ContentValidator:
     @classmethod
     def validate_content(cls, content: str, age: Optional[int] = None) -> Dict[str, Any]:
         """Validate content for safety and age-appropriateness"""
-        content_lower = content.lower()
-        
-        # Check for blocked topics
-        blocked_found = []
-        for blocked in cls.BLOCKED_TOPICS:
-            if blocked in content_lower:
-                blocked_found.append(blocked)
+        return cls._validate_content_lower(content.lower(), age)
+    
+    @classmethod
+    def _validate_content_lower(cls, content_lower: str, age: Optional[int] = None) -> Dict[str, Any]:
+        """validate_content for content that is already lowercased"""
+        reason, keywords, age_appropriate = cls._validate(content_lower, age)
         
-        if blocked_found:
+        if reason == "blocked_topics":
             return {
                 "safe": False,
                 "reason": "blocked_topics",
-                "blocked_items": blocked_found,
+                "blocked_items": list(keywords),
                 "suggestion": "Let's talk about something more fun!"
             }
         
-        # Check for emotional distress
-        emotional_keywords = []
-        for keyword in cls.EMOTIONAL_SUPPORT_KEYWORDS:
-            if keyword in content_lower:
-                emotional_keywords.append(keyword)
-        
-        # Content length check
-        if len(content) > 500:
+        if reason == "too_long":
             return {
                 "safe": False,
                 "reason": "too_long",
@@ -72,27 +73,63 @@ class ContentValidator:
         
         return {
             "safe": True,
-            "emotional_keywords": emotional_keywords,
-            "needs_support": len(emotional_keywords) > 0,
-            "age_appropriate": cls._check_age_appropriate(content_lower, age)
+            "emotional_keywords": list(keywords),
+            "needs_support": len(keywords) > 0,
+            "age_appropriate": age_appropriate
         }
     
+    @staticmethod
+    @functools.lru_cache(maxsize=2048)
+    def _validate(content_lower: str, age: Optional[int]) -> Tuple[Optional[str], Tuple[str, ...], bool]:
+        """Cached scan returning (failure reason, blocked or emotional keywords, age ok)
+
+        Short replies ("yes", "ok", "hi") repeat constantly, so results are
+        memoized per (content, age) and kept immutable.
+        """
+        # Check for blocked topics and emotional distress in one scan
+        found = _scan_keywords(content_lower, ("blocked", "emotional"))
+        blocked_found = found["blocked"]
+        
+        if blocked_found:
+            return "blocked_topics", tuple(blocked_found), False
+        
+        # Check for emotional distress
+        emotional_keywords = found["emotional"]
+        
+        # Content length check
+        if len(content_lower) > 500:
+            return "too_long", (), False
+        
+        tokens = frozenset(_WORD_RE.findall(content_lower)) if age and age <= 12 else frozenset()
+        return None, tuple(emotional_keywords), ContentValidator._check_age_appropriate(tokens, age)
+    
+    @classmethod
+    def scan_batch(cls, texts: List[str]) -> List[Dict[str, List[str]]]:
+        """Find blocked, emotional, crisis and distress keywords in many texts at once
+
+        Meant for bulk jobs such as rescanning stored conversations for
+        parental reports; returns one dict of category -> keywords per text.
+        """
+        return _scan_keywords_batch([text.lower() for text in texts], tuple(_KEYWORD_CATEGORIES))
+    
+    # Words that mark content as beyond an age tier
+    _COMPLEX_WORDS = frozenset({"because", "however", "therefore", "although", "consequently"})
+    _ADULT_CONCEPTS = frozenset({"mortgage", "taxes", "politics", "economics", "philosophy"})
+    
     @classmethod
-    def _check_age_appropriate(cls, content: str, age: Optional[int]) -> bool:
-        """Check if content is appropriate for the given age"""
+    def _check_age_appropriate(cls, tokens: frozenset, age: Optional[int]) -> bool:
+        """Check if content, given as its set of words, is appropriate for the given age"""
         if not age:
             return True  # Default to permissive if age unknown
         
         # Very young children (4-6) - strict filtering
         if age <= 6:
-            complex_words = ["because", "however", "therefore", "although", "consequently"]
-            if any(word in content for word in complex_words):
+            if not tokens.isdisjoint(cls._COMPLEX_WORDS):
                 return False
         
         # School age (7-12) - moderate filtering
         elif age <= 12:
-            adult_concepts = ["mortgage", "taxes", "politics", "economics", "philosophy"]
-            if any(concept in content for concept in adult_concepts):
+            if not tokens.isdisjoint(cls._ADULT_CONCEPTS):
                 return False
         
         return True
@@ -104,24 +141,36 @@ class ConversationMonitor:
     def __init__(self):
         self.user_sessions: Dict[str, Dict[str, Any]] = {}
         self.max_session_duration = timedelta(hours=2)
+        self._max_duration_s = self.max_session_duration.total_seconds()
         self.max_messages_per_session = 50
     
     def start_session(self, user_id: str, age: Optional[int] = None) -> Dict[str, Any]:
         """Start a new conversation session"""
         self.user_sessions[user_id] = {
-            "start_time": datetime.now(),
+            "start_monotonic": time.monotonic(),
+            "start_wall": datetime.now(),  # for reporting only
             "message_count": 0,
             "age": age,
             "topics": [],
-            "emotional_flags": [],
+            "emotional_flags": Counter(),
             "safety_warnings": 0
         }
         
         logger.info(f"Started conversation session for user {user_id}")
         return {"session_started": True, "session_id": user_id}
     
-    def log_message(self, user_id: str, content: str, is_user: bool = True) -> Dict[str, Any]:
-        """Log a message and check session limits"""
+    def log_message(
+        self,
+        user_id: str,
+        content: str,
+        is_user: bool = True,
+        precomputed_validation: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Log a message and check session limits
+
+        Pass ``precomputed_validation`` when the caller already ran
+        ContentValidator on this content to avoid validating it twice.
+        """
         if user_id not in self.user_sessions:
             self.start_session(user_id)
         
@@ -129,8 +178,8 @@ class ConversationMonitor:
         session["message_count"] += 1
         
         # Check session duration
-        session_duration = datetime.now() - session["start_time"]
-        if session_duration > self.max_session_duration:
+        elapsed = time.monotonic() - session["start_monotonic"]
+        if elapsed > self._max_duration_s:
             return {
                 "continue": False,
                 "reason": "session_timeout",
@@ -147,7 +196,7 @@ class ConversationMonitor:
         
         # Validate content if it's from user
         if is_user:
-            validation = ContentValidator.validate_content(content, session["age"])
+            validation = precomputed_validation or ContentValidator.validate_content(content, session["age"])
             if not validation["safe"]:
                 session["safety_warnings"] += 1
                 
@@ -166,7 +215,7 @@ class ConversationMonitor:
             
             # Track emotional support needs
             if validation.get("needs_support"):
-                session["emotional_flags"].extend(validation["emotional_keywords"])
+                session["emotional_flags"].update(validation["emotional_keywords"])
         
         return {"continue": True, "session_healthy": True}
     
@@ -176,14 +225,14 @@ class ConversationMonitor:
             return {"no_session": True}
         
         session = self.user_sessions[user_id]
-        duration = datetime.now() - session["start_time"]
+        elapsed = time.monotonic() - session["start_monotonic"]
         
         return {
-            "duration_minutes": int(duration.total_seconds() / 60),
+            "duration_minutes": int(elapsed // 60),
             "message_count": session["message_count"],
             "safety_warnings": session["safety_warnings"],
-            "emotional_support_needed": len(session["emotional_flags"]) > 0,
-            "emotional_keywords": list(set(session["emotional_flags"])),
+            "emotional_support_needed": bool(session["emotional_flags"]),
+            "emotional_keywords": list(session["emotional_flags"]),
             "session_healthy": session["safety_warnings"] < 3
         }
     
@@ -214,18 +263,14 @@ class EmergencyHandler:
     @classmethod
     def check_crisis_indicators(cls, content: str) -> Dict[str, Any]:
         """Check for crisis or emergency indicators"""
-        content_lower = content.lower()
-        
-        crisis_found = []
-        distress_found = []
-        
-        for keyword in cls.CRISIS_KEYWORDS:
-            if keyword in content_lower:
-                crisis_found.append(keyword)
-        
-        for keyword in cls.DISTRESS_KEYWORDS:
-            if keyword in content_lower:
-                distress_found.append(keyword)
+        return cls._check_crisis_lower(content.lower())
+    
+    @classmethod
+    def _check_crisis_lower(cls, content_lower: str) -> Dict[str, Any]:
+        """check_crisis_indicators for content that is already lowercased"""
+        found = _scan_keywords(content_lower, ("crisis", "distress"))
+        crisis_found = found["crisis"]
+        distress_found = found["distress"]
         
         if crisis_found:
             logger.critical(f"CRISIS INDICATORS DETECTED: {crisis_found}")
@@ -269,6 +314,160 @@ class EmergencyHandler:
         return responses.get(primary_emotion, "I can hear that you're having some big feelings. That's okay - all feelings are okay. Tell me more about it.")
 
 
+# Keyword lists by category, shared by the content and crisis checks
+_KEYWORD_CATEGORIES = {
+    "blocked": ContentValidator.BLOCKED_TOPICS,
+    "emotional": ContentValidator.EMOTIONAL_SUPPORT_KEYWORDS,
+    "crisis": EmergencyHandler.CRISIS_KEYWORDS,
+    "distress": EmergencyHandler.DISTRESS_KEYWORDS,
+}
+
+
+def _build_keyword_automaton():
+    """Build one Aho-Corasick automaton over every keyword category.
+
+    A keyword can belong to several categories ("violence"), so each word
+    maps to its length plus a tuple of (category, list index) tags.
+    """
+    tags: Dict[str, list] = {}
+    for category, keywords in _KEYWORD_CATEGORIES.items():
+        for index, keyword in enumerate(keywords):
+            tags.setdefault(keyword, []).append((category, index))
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, keyword_tags in tags.items():
+        automaton.add_word(keyword, (len(keyword), tuple(keyword_tags)))
+    automaton.make_automaton()
+    return automaton
+
+
+def _compile_category(keywords) -> Optional[re.Pattern]:
+    """Compile the multi-word keywords of a category into one whole-word alternation.
+
+    A plural "s"/"es" suffix still counts as a match ("weapons"). The
+    lookahead lets findall report overlapping keywords as well.
+    """
+    if not keywords:
+        return None
+    alternation = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf"(?=\b({alternation})(?:e?s)?\b)")
+
+
+_WORD_RE = re.compile(r"\w+")
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton() if ahocorasick is not None else None
+# Fallback without the automaton: single words are set lookups against the
+# content's tokens, only phrases ("hurt myself") still need a regex
+_SINGLE_KEYWORDS = {
+    category: frozenset(k for k in keywords if " " not in k)
+    for category, keywords in _KEYWORD_CATEGORIES.items()
+}
+_PHRASE_PATTERNS = {
+    category: _compile_category([k for k in keywords if " " in k])
+    for category, keywords in _KEYWORD_CATEGORIES.items()
+}
+
+
+def _token_forms(content_lower: str) -> set:
+    """Tokenize the content, adding each token's singular for "s"/"es" plurals"""
+    forms = set()
+    for token in _WORD_RE.findall(content_lower):
+        forms.add(token)
+        if token.endswith("s"):
+            forms.add(token[:-1])
+            if token.endswith("es"):
+                forms.add(token[:-2])
+    return forms
+
+
+def _is_word_char(char: str) -> bool:
+    """Match the regex notion of a word character"""
+    return char.isalnum() or char == "_"
+
+
+def _ends_word(content: str, pos: int) -> bool:
+    """Check that a word ends at ``pos``, allowing a plural "s"/"es" suffix"""
+    for suffix in ("", "s", "es"):
+        end = pos + len(suffix)
+        if content.startswith(suffix, pos) and (end >= len(content) or not _is_word_char(content[end])):
+            return True
+    return False
+
+
+def _scan_keywords(content_lower: str, categories) -> Dict[str, List[str]]:
+    """Return the whole-word keywords of each requested category found in the content"""
+    if _KEYWORD_AUTOMATON is None:
+        tokens = _token_forms(content_lower)
+        found = {}
+        for category in categories:
+            hits = tokens & _SINGLE_KEYWORDS[category]
+            pattern = _PHRASE_PATTERNS[category]
+            if pattern is not None:
+                hits.update(pattern.findall(content_lower))
+            found[category] = hits
+        # Report keywords in list order
+        return {
+            category: [k for k in _KEYWORD_CATEGORIES[category] if k in hits]
+            for category, hits in found.items()
+        }
+    
+    hits = {category: set() for category in categories}
+    for end, (length, keyword_tags) in _KEYWORD_AUTOMATON.iter(content_lower):
+        start = end - length + 1
+        # Whole words only, so "mad" does not fire inside "made"
+        if start > 0 and _is_word_char(content_lower[start - 1]):
+            continue
+        if not _ends_word(content_lower, end + 1):
+            continue
+        for category, index in keyword_tags:
+            if category in hits:
+                hits[category].add(index)
+    
+    # Report keywords in list order
+    return {
+        category: [_KEYWORD_CATEGORIES[category][i] for i in sorted(indices)]
+        for category, indices in hits.items()
+    }
+
+
+def _scan_keywords_batch(contents_lower: List[str], categories) -> List[Dict[str, List[str]]]:
+    """_scan_keywords for many texts, with a single automaton pass over all of them
+
+    The texts are joined with newlines, which no keyword contains, so a hit
+    never spans two texts and the separators act as word boundaries.
+    """
+    if _KEYWORD_AUTOMATON is None:
+        return [_scan_keywords(content_lower, categories) for content_lower in contents_lower]
+    
+    joined = "\n".join(contents_lower)
+    starts = []
+    offset = 0
+    for content_lower in contents_lower:
+        starts.append(offset)
+        offset += len(content_lower) + 1
+    
+    hits = [{category: set() for category in categories} for _ in contents_lower]
+    for end, (length, keyword_tags) in _KEYWORD_AUTOMATON.iter(joined):
+        start = end - length + 1
+        if start > 0 and _is_word_char(joined[start - 1]):
+            continue
+        if not _ends_word(joined, end + 1):
+            continue
+        text_hits = hits[bisect.bisect_right(starts, start) - 1]
+        for category, index in keyword_tags:
+            if category in text_hits:
+                text_hits[category].add(index)
+    
+    # Report keywords in list order
+    return [
+        {
+            category: [_KEYWORD_CATEGORIES[category][i] for i in sorted(indices)]
+            for category, indices in text_hits.items()
+        }
+        for text_hits in hits
+    ]
+
+
 class SafetyManager:
     """Main safety management coordinator"""
     
@@ -290,8 +489,11 @@ class SafetyManager:
             self.conversation_monitor.start_session(user_id, age)
             self.active_sessions[user_id] = True
         
+        # Lowercase once for all keyword checks
+        content_lower = content.lower()
+        
         # Check for crisis indicators
-        crisis_check = EmergencyHandler.check_crisis_indicators(content)
+        crisis_check = EmergencyHandler._check_crisis_lower(content_lower)
         if crisis_check["immediate_action"]:
             return {
                 "safe": False,
@@ -302,7 +504,7 @@ class SafetyManager:
             }
         
         # Validate content
-        validation = ContentValidator.validate_content(content, age)
+        validation = ContentValidator._validate_content_lower(content_lower, age)
         if not validation["safe"]:
             return {
                 "safe": False,
@@ -311,7 +513,9 @@ class SafetyManager:
             }
         
         # Log message and check session limits
-        session_check = self.conversation_monitor.log_message(user_id, content, is_user_input)
+        session_check = self.conversation_monitor.log_message(
+            user_id, content, is_user_input, precomputed_validation=validation
+        )
         if not session_check["continue"]:
             return {
                 "safe": False,
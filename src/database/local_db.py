@@ -2,59 +2,175 @@
 Local SQLite database manager for heyBuddy
 All sensitive data stays local on device
 """
+import asyncio
+import functools
+import json
 import logging
 import sqlite3
-from sqlalchemy import create_engine, text
+import struct
+import time
+from sqlalchemy import case, create_engine, event, func, insert, inspect, make_url, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from contextlib import contextmanager
-from typing import Optional, List, Dict, Any
-import json
-import uuid
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+from types import SimpleNamespace
+from datetime import datetime
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import base64
 import os
 
 from database.models import Base, User, ConversationSession, Conversation, Goal, GoalProgress
+from database import sync_tables  # registers the sync tables on Base.metadata
 from core.config import settings
 
+try:
+    import orjson  # optional: faster JSON encode/decode for JSON columns
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 
+def _new_id() -> str:
+    """Time-ordered row id: 48-bit millisecond timestamp + 80 random bits as 32 hex chars
+
+    Like a ULID, ids sort by creation time, so primary-key inserts append to
+    the end of the B-tree instead of landing on random pages.
+    """
+    return f"{time.time_ns() // 1_000_000:012x}{os.urandom(10).hex()}"
+
+
+def _queue_pool_args(db_url: str) -> Dict[str, Any]:
+    """Pool sizing for engines that use QueuePool (file-backed SQLite or a server)
+
+    In-memory SQLite uses SingletonThreadPool, which rejects these arguments.
+    """
+    url = make_url(db_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    # Bounded pool; connections to the local file never go stale,
+    # so no pre-ping round trip on checkout
+    return {"pool_size": 5, "max_overflow": 5, "pool_recycle": 1800}
+
+
+def _data_dir(db_url: str) -> str:
+    """Directory holding a file-backed SQLite database, else the default data dir"""
+    url = make_url(db_url)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return os.path.dirname(url.database) or "."
+    return "data"
+
+
+def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+    """Use WAL with relaxed fsync and in-memory temp tables on every connection"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.close()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_or_create_key() -> bytes:
+    """Get existing encryption key or create new one, reading the file once"""
+    key_file = "data/encryption.key"
+    
+    if os.path.exists(key_file):
+        with open(key_file, 'rb') as f:
+            return f.read()
+    else:
+        # Create new key
+        os.makedirs("data", exist_ok=True)
+        key = Fernet.generate_key()
+        with open(key_file, 'wb') as f:
+            f.write(key)
+        logger.info("Generated new encryption key")
+        return key
+
+
+@functools.lru_cache(maxsize=4)
+def _get_ciphers(fernet_key: bytes) -> Tuple[Fernet, AESGCM]:
+    """Build the legacy Fernet cipher and the AES-GCM cipher for a key once per process
+    
+    The AES-GCM key is derived from the stored Fernet key.
+    """
+    aead_key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"heybuddy-aesgcm"
+    ).derive(base64.urlsafe_b64decode(fernet_key))
+    return Fernet(fernet_key), AESGCM(aead_key)
+
+
+_HISTORY_COLUMNS = "id, timestamp, message_type, persona_used, emotional_support, content_category"
+_HISTORY_QUERY = "SELECT {} FROM conversations WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?"
+_HISTORY_SQL = _HISTORY_QUERY.format(_HISTORY_COLUMNS)
+_HISTORY_SQL_DECRYPT = _HISTORY_QUERY.format(
+    _HISTORY_COLUMNS + ", messages_encrypted, user_message_encrypted, ai_response_encrypted"
+)
+
+
 class EncryptionManager:
-    """Handle encryption for sensitive data"""
+    """Handle encryption for sensitive data
+    
+    New values are AES-256-GCM encrypted; values written by the older
+    Fernet format still decrypt.
+    """
+    
+    # Leading byte of AES-GCM payloads; Fernet tokens start with "g"
+    AESGCM_VERSION = b"\x01"
+    NONCE_SIZE = 12
     
     def __init__(self, key: Optional[str] = None):
         if key:
             self.key = key.encode()
         else:
             # Generate or load encryption key
-            self.key = self._get_or_create_key()
-        self.cipher = Fernet(self.key)
-    
-    def _get_or_create_key(self) -> bytes:
-        """Get existing encryption key or create new one"""
-        key_file = "data/encryption.key"
-        
-        if os.path.exists(key_file):
-            with open(key_file, 'rb') as f:
-                return f.read()
-        else:
-            # Create new key
-            os.makedirs("data", exist_ok=True)
-            key = Fernet.generate_key()
-            with open(key_file, 'wb') as f:
-                f.write(key)
-            logger.info("Generated new encryption key")
-            return key
+            self.key = _load_or_create_key()
+        self.cipher, self._aead = _get_ciphers(self.key)
     
     def encrypt(self, text: str) -> str:
         """Encrypt text and return base64 encoded string"""
         if not text:
             return ""
-        encrypted = self.cipher.encrypt(text.encode())
-        return base64.b64encode(encrypted).decode()
+        nonce = os.urandom(self.NONCE_SIZE)
+        encrypted = self._aead.encrypt(nonce, text.encode(), None)
+        return base64.b64encode(self.AESGCM_VERSION + nonce + encrypted).decode()
+    
+    def encrypt_pair(self, first: str, second: str) -> bytes:
+        """Encrypt two strings together into one raw AES-GCM blob"""
+        first_bytes = first.encode()
+        payload = struct.pack("<I", len(first_bytes)) + first_bytes + second.encode()
+        nonce = os.urandom(self.NONCE_SIZE)
+        return self.AESGCM_VERSION + nonce + self._aead.encrypt(nonce, payload, None)
+    
+    def decrypt_pair(self, encrypted: bytes) -> Tuple[str, str]:
+        """Decrypt a blob written by encrypt_pair"""
+        if not encrypted:
+            return "", ""
+        try:
+            nonce_end = 1 + self.NONCE_SIZE
+            payload = self._aead.decrypt(encrypted[1:nonce_end], encrypted[nonce_end:], None)
+            (first_len,) = struct.unpack_from("<I", payload)
+            split = 4 + first_len
+            return payload[4:split].decode(), payload[split:].decode()
+        except Exception as e:
+            logger.error(f"Decryption failed: {e}")
+            return "", ""
     
     def decrypt(self, encrypted_text: str) -> str:
         """Decrypt base64 encoded encrypted text"""
@@ -62,7 +178,12 @@ class EncryptionManager:
             return ""
         try:
             encrypted = base64.b64decode(encrypted_text.encode())
-            decrypted = self.cipher.decrypt(encrypted)
+            if encrypted[:1] == self.AESGCM_VERSION:
+                nonce_end = 1 + self.NONCE_SIZE
+                decrypted = self._aead.decrypt(encrypted[1:nonce_end], encrypted[nonce_end:], None)
+            else:
+                # Legacy Fernet token
+                decrypted = self.cipher.decrypt(encrypted)
             return decrypted.decode()
         except Exception as e:
             logger.error(f"Decryption failed: {e}")
@@ -72,37 +193,76 @@ class EncryptionManager:
 class LocalDatabase:
     """Local SQLite database manager"""
     
-    def __init__(self, db_url: Optional[str] = None):
+    # Write-behind batching for conversation records
+    FLUSH_BATCH_SIZE = 32
+    # Bounds how much unwritten conversation a crash or power loss can cost
+    FLUSH_INTERVAL_SECONDS = 2.0
+    # Consecutive locked/busy failures before a queued batch is written row by row
+    FLUSH_MAX_RETRIES = 5
+    # Rows that cannot be written at all are appended here (JSON lines),
+    # next to the database file
+    QUARANTINE_FILENAME = "failed_conversations.jsonl"
+    
+    def __init__(self, db_url: Optional[str] = None, encryption_key: Optional[str] = None):
         self.db_url = db_url or settings.database_url
+        self.data_dir = _data_dir(self.db_url)
+        self.quarantine_file = os.path.join(self.data_dir, self.QUARANTINE_FILENAME)
         self.engine = None
         self.SessionLocal = None
-        self.encryption = EncryptionManager()
+        self.encryption = EncryptionManager(encryption_key)
+        
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_session_deltas: Dict[str, Dict[str, Any]] = {}
+        # user_id -> id of the open ConversationSession
+        self._active_session_ids: Dict[str, str] = {}
+        self._last_flush = time.monotonic()
+        self._flush_failures = 0
+        self._flusher_task: Optional[asyncio.Task] = None
         
     async def initialize(self) -> bool:
         """Initialize database connection and create tables"""
         try:
             # Create data directory if needed
-            os.makedirs("data", exist_ok=True)
+            os.makedirs(self.data_dir, exist_ok=True)
             
             # Create engine
             self.engine = create_engine(
                 self.db_url,
-                connect_args={"check_same_thread": False}  # For SQLite
+                connect_args={"check_same_thread": False},  # For SQLite
+                json_serializer=_dumps,
+                json_deserializer=_loads,
+                pool_pre_ping=False,
+                **_queue_pool_args(self.db_url)
             )
+            if self.engine.dialect.name == "sqlite":
+                event.listen(self.engine, "connect", _set_sqlite_pragmas)
             
             # Create session factory
             self.SessionLocal = sessionmaker(
                 autocommit=False,
                 autoflush=False,
+                # Rows returned from get_session() stay readable after it closes
+                expire_on_commit=False,
                 bind=self.engine
             )
             
             # Create all tables
             Base.metadata.create_all(bind=self.engine)
+            self._upgrade_schema()
+            
+            # create_all skips indexes on tables that already exist
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=self.engine, checkfirst=True)
             
             # Test connection
             with self.get_session() as session:
                 session.execute(text("SELECT 1"))
+                if self.engine.dialect.name == "sqlite":
+                    session.execute(text("PRAGMA optimize"))
+            
+            # Periodically write out buffered conversations
+            self._flusher_task = asyncio.get_running_loop().create_task(self._flusher())
             
             logger.info("Local database initialized successfully")
             return True
@@ -111,6 +271,34 @@ class LocalDatabase:
             logger.error(f"Failed to initialize local database: {e}")
             return False
     
+    def _upgrade_schema(self):
+        """Add columns introduced after a database was first created, drop retired indexes"""
+        inspector = inspect(self.engine)
+        session_columns = {c["name"] for c in inspector.get_columns("conversation_sessions")}
+        conversation_columns = {c["name"] for c in inspector.get_columns("conversations")}
+        
+        with self.engine.begin() as conn:
+            # Session start/end datetimes became integer timestamps
+            if "start_ts" not in session_columns:
+                conn.execute(text("ALTER TABLE conversation_sessions ADD COLUMN start_ts INTEGER"))
+                conn.execute(text("ALTER TABLE conversation_sessions ADD COLUMN end_ts INTEGER"))
+                conn.execute(text(
+                    "UPDATE conversation_sessions SET "
+                    "start_ts = CAST(strftime('%s', start_time) AS INTEGER), "
+                    "end_ts = CAST(strftime('%s', end_time) AS INTEGER)"
+                ))
+                logger.info("Migrated conversation session times to integer timestamps")
+            
+            # Message pairs are encrypted into one blob; old rows keep their columns
+            if "messages_encrypted" not in conversation_columns:
+                conn.execute(text("ALTER TABLE conversations ADD COLUMN messages_encrypted BLOB"))
+                logger.info("Added encrypted message pair column")
+            
+            # Superseded by the composite indexes ix_cs_user_start, ix_cs_active
+            # and ix_conv_user_time
+            conn.execute(text("DROP INDEX IF EXISTS ix_conversation_sessions_start_ts"))
+            conn.execute(text("DROP INDEX IF EXISTS ix_conversations_timestamp"))
+    
     @contextmanager
     def get_session(self) -> Session:
         """Get database session with automatic cleanup"""
@@ -128,26 +316,22 @@ class LocalDatabase:
     def create_user(self, user_id: str, name: str, age: Optional[int] = None) -> User:
         """Create new user with encrypted data"""
         with self.get_session() as session:
-            # Check if user exists
-            existing = session.query(User).filter(User.id == user_id).first()
-            if existing:
-                return existing
-            
-            user = User(
-                id=user_id,
-                name_encrypted=self.encryption.encrypt(name),
-                age=age,
-                settings=json.dumps({
-                    "persona": "friendly",
-                    "safety_level": "standard",
-                    "parent_notifications": True
-                })
+            # Insert unless the user exists, without a separate existence query
+            result = session.execute(
+                sqlite_insert(User.__table__).values(
+                    id=user_id,
+                    name_encrypted=self.encryption.encrypt(name),
+                    age=age,
+                    settings={
+                        "persona": "friendly",
+                        "safety_level": "standard",
+                        "parent_notifications": True
+                    }
+                ).on_conflict_do_nothing(index_elements=["id"])
             )
-            
-            session.add(user)
-            session.commit()
-            logger.info(f"Created new user: {user_id}")
-            return user
+            if result.rowcount:
+                logger.info(f"Created new user: {user_id}")
+            return session.get(User, user_id)
     
     def get_user(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
@@ -168,21 +352,22 @@ class LocalDatabase:
             # End any existing active sessions
             active_sessions = session.query(ConversationSession).filter(
                 ConversationSession.user_id == user_id,
-                ConversationSession.end_time.is_(None)
+                ConversationSession.end_ts.is_(None)
             ).all()
             
+            now = int(time.time())
             for active in active_sessions:
-                active.end_time = datetime.utcnow()
-                duration = (active.end_time - active.start_time).total_seconds() / 60
-                active.duration_minutes = int(duration)
+                active.end_ts = now
+                active.duration_minutes = (now - active.start_ts) // 60
             
             # Create new session
             new_session = ConversationSession(
-                id=str(uuid.uuid4()),
+                id=_new_id(),
                 user_id=user_id
             )
             
             session.add(new_session)
+            self._active_session_ids[user_id] = new_session.id
             session.commit()
             logger.info(f"Started conversation session for user {user_id}")
             return new_session
@@ -192,20 +377,23 @@ class LocalDatabase:
         with self.get_session() as session:
             return session.query(ConversationSession).filter(
                 ConversationSession.user_id == user_id,
-                ConversationSession.end_time.is_(None)
+                ConversationSession.end_ts.is_(None)
             ).first()
     
     def end_conversation_session(self, session_id: str) -> Optional[ConversationSession]:
         """End conversation session"""
+        # Write the session's queued conversations before closing it
+        self._flush()
         with self.get_session() as session:
             conv_session = session.query(ConversationSession).filter(
                 ConversationSession.id == session_id
             ).first()
             
             if conv_session:
-                conv_session.end_time = datetime.utcnow()
-                duration = (conv_session.end_time - conv_session.start_time).total_seconds() / 60
-                conv_session.duration_minutes = int(duration)
+                conv_session.end_ts = int(time.time())
+                conv_session.duration_minutes = (conv_session.end_ts - conv_session.start_ts) // 60
+                if self._active_session_ids.get(conv_session.user_id) == session_id:
+                    del self._active_session_ids[conv_session.user_id]
                 session.commit()
                 logger.info(f"Ended conversation session {session_id}")
                 return conv_session
@@ -219,50 +407,173 @@ class LocalDatabase:
         ai_response: str,
         session_id: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None
-    ) -> Conversation:
-        """Store conversation with encryption"""
+    ) -> SimpleNamespace:
+        """Store conversation with encryption
+        
+        Returns the queued row's fields as attributes (id, session_id, ...).
+        """
         
         # Get or create session
         if not session_id:
-            active_session = self.get_active_session(user_id)
-            if not active_session:
-                active_session = self.start_conversation_session(user_id)
-            session_id = active_session.id
+            session_id = self._active_session_ids.get(user_id) or self._resolve_active_session(user_id)
+        
+        # Create conversation record as a plain row for a Core insert
+        row = {
+            "id": _new_id(),
+            "user_id": user_id,
+            "session_id": session_id,
+            "timestamp": datetime.utcnow(),
+            "messages_encrypted": self.encryption.encrypt_pair(user_message, ai_response),
+            "message_type": metadata.get("type", "text") if metadata else "text",
+            "persona_used": metadata.get("persona", "friendly") if metadata else "friendly",
+            "emotional_support": metadata.get("emotional_support", False) if metadata else False,
+            "content_category": metadata.get("category") if metadata else None
+        }
+        
+        # Queue the record and session metrics; they are written in batches
+        self._pending.append(row)
+        delta = self._pending_session_deltas.setdefault(
+            session_id, {"messages": 0, "topics": [], "emotional_support": False}
+        )
+        delta["messages"] += 1
+        if metadata and metadata.get("topic") and metadata["topic"] not in delta["topics"]:
+            delta["topics"].append(metadata["topic"])
+        if metadata and metadata.get("emotional_support"):
+            delta["emotional_support"] = True
         
+        if (len(self._pending) >= self.FLUSH_BATCH_SIZE
+                or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL_SECONDS):
+            self._flush()
+        return SimpleNamespace(**row)
+    
+    def _flush(self):
+        """Write queued conversations and session metrics in one transaction"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        
+        try:
+            self._write_batch(self._pending, self._pending_session_deltas)
+        except OperationalError as e:
+            # Locked or busy database: keep the queue so the next flush retries it
+            self._flush_failures += 1
+            if self._flush_failures < self.FLUSH_MAX_RETRIES:
+                logger.warning(f"Failed to flush {len(self._pending)} conversations "
+                               f"(attempt {self._flush_failures}): {e}")
+                return
+            self._salvage_pending(e)
+            return
+        except SQLAlchemyError as e:
+            # Retrying the batch would fail the same way and block every later
+            # write; cached session ids may be stale, so resolve them afresh
+            self._salvage_pending(e)
+            self._active_session_ids.clear()
+            return
+        
+        self._flush_failures = 0
+        self._pending = []
+        self._pending_session_deltas = {}
+    
+    def _write_batch(self, rows: List[Dict[str, Any]], deltas: Dict[str, Dict[str, Any]]):
+        """Insert conversation rows and apply their session metrics in one transaction"""
         with self.get_session() as session:
-            # Update session metrics
-            conv_session = session.query(ConversationSession).filter(
-                ConversationSession.id == session_id
-            ).first()
+            # Core executemany; these rows are never read back through the ORM
+            session.execute(insert(Conversation.__table__), rows)
             
-            if conv_session:
-                conv_session.message_count += 1
-                conv_session.last_activity = datetime.utcnow()
-                
-                # Add topic if provided in metadata
-                if metadata and metadata.get("topic"):
-                    conv_session.add_topic(metadata["topic"])
+            for session_id, delta in deltas.items():
+                values = {"message_count": ConversationSession.message_count + delta["messages"]}
+                if delta["emotional_support"]:
+                    values["emotional_support_triggered"] = True
+                session.execute(
+                    update(ConversationSession)
+                    .where(ConversationSession.id == session_id)
+                    .values(**values)
+                )
                 
-                # Track emotional support
-                if metadata and metadata.get("emotional_support"):
-                    conv_session.emotional_support_triggered = True
-            
-            # Create conversation record
-            conversation = Conversation(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                session_id=session_id,
-                user_message_encrypted=self.encryption.encrypt(user_message),
-                ai_response_encrypted=self.encryption.encrypt(ai_response),
-                message_type=metadata.get("type", "text") if metadata else "text",
-                persona_used=metadata.get("persona", "friendly") if metadata else "friendly",
-                emotional_support=metadata.get("emotional_support", False) if metadata else False,
-                content_category=metadata.get("category") if metadata else None
-            )
+                # Topics live in a JSON column, so they still need the row
+                if delta["topics"]:
+                    conv_session = session.get(ConversationSession, session_id)
+                    if conv_session:
+                        if conv_session.topics is None:
+                            conv_session.topics = []
+                        for topic in delta["topics"]:
+                            if topic not in conv_session.topics:
+                                conv_session.topics.append(topic)
+    
+    def _salvage_pending(self, error: SQLAlchemyError):
+        """Write the failed batch row by row and quarantine rows that still fail"""
+        rows, self._pending = self._pending, []
+        deltas, self._pending_session_deltas = self._pending_session_deltas, {}
+        self._flush_failures = 0
+        logger.warning(f"Batch flush of {len(rows)} conversations failed, "
+                       f"retrying row by row: {error}")
+        
+        failed = []
+        for row in rows:
+            # Session topics ride along with the first row written for the session
+            session_delta = deltas.pop(row["session_id"], None)
+            delta = {
+                "messages": 1,
+                "topics": session_delta["topics"] if session_delta else [],
+                "emotional_support": bool(row["emotional_support"]),
+            }
+            try:
+                self._write_batch([row], {row["session_id"]: delta})
+            except SQLAlchemyError as e:
+                if session_delta is not None:
+                    deltas[row["session_id"]] = session_delta
+                failed.append((row, e))
+        
+        if failed:
+            self._quarantine(failed)
+    
+    def _quarantine(self, failed: List[Tuple[Dict[str, Any], SQLAlchemyError]]):
+        """Append rows that could not be written to the quarantine file for later recovery"""
+        ids = ", ".join(row["id"] for row, _ in failed)
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+            with open(self.quarantine_file, "a", encoding="utf-8") as f:
+                for row, e in failed:
+                    record = dict(
+                        row,
+                        timestamp=row["timestamp"].isoformat(),
+                        # Already encrypted, so the file holds no plaintext
+                        messages_encrypted=base64.b64encode(row["messages_encrypted"]).decode(),
+                        error=str(e),
+                    )
+                    f.write(_dumps(record) + "\n")
+        except OSError as e:
+            logger.error(f"Lost {len(failed)} conversations ({ids}), "
+                         f"could not write {self.quarantine_file}: {e}")
+            return
+        logger.error(f"Quarantined {len(failed)} conversations ({ids}) in {self.quarantine_file}")
+    
+    def _resolve_active_session(self, user_id: str) -> str:
+        """Find or open the user's active session in a single transaction"""
+        with self.get_session() as session:
+            session_id = session.query(ConversationSession.id).filter(
+                ConversationSession.user_id == user_id,
+                ConversationSession.end_ts.is_(None)
+            ).scalar()
             
-            session.add(conversation)
-            session.commit()
-            return conversation
+            if session_id is None:
+                session_id = _new_id()
+                session.add(ConversationSession(id=session_id, user_id=user_id))
+                logger.info(f"Started conversation session for user {user_id}")
+        
+        self._active_session_ids[user_id] = session_id
+        return session_id
+    
+    async def _flusher(self):
+        """Flush queued writes that have waited longer than the flush interval"""
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL_SECONDS)
+            if time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL_SECONDS:
+                self._flush()
+    
+    async def flush(self):
+        """Write out all queued conversations now"""
+        self._flush()
     
     def get_conversation_history(
         self,
@@ -271,31 +582,40 @@ class LocalDatabase:
         decrypt: bool = False
     ) -> List[Dict[str, Any]]:
         """Get conversation history"""
-        with self.get_session() as session:
-            conversations = session.query(Conversation).filter(
-                Conversation.user_id == user_id
-            ).order_by(Conversation.timestamp.desc()).limit(limit).all()
+        self._flush()
+        # Read-only path: plain rows from the driver, no ORM hydration
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql(
+                _HISTORY_SQL_DECRYPT if decrypt else _HISTORY_SQL,
+                (user_id, limit)
+            ).fetchall()
+        
+        history = []
+        for row in rows:
+            conv_dict = {
+                "id": row[0],
+                # SQLite stores "YYYY-MM-DD HH:MM:SS.ffffff"
+                "timestamp": row[1].replace(" ", "T", 1),
+                "message_type": row[2],
+                "persona_used": row[3],
+                "emotional_support": bool(row[4]),
+                "content_category": row[5]
+            }
             
-            history = []
-            for conv in conversations:
-                conv_dict = {
-                    "id": conv.id,
-                    "timestamp": conv.timestamp.isoformat(),
-                    "message_type": conv.message_type,
-                    "persona_used": conv.persona_used,
-                    "emotional_support": conv.emotional_support,
-                    "content_category": conv.content_category
-                }
-                
-                if decrypt:
-                    conv_dict.update({
-                        "user_message": self.encryption.decrypt(conv.user_message_encrypted),
-                        "ai_response": self.encryption.decrypt(conv.ai_response_encrypted)
-                    })
-                
-                history.append(conv_dict)
+            if decrypt:
+                if row[6] is not None:
+                    user_message, ai_response = self.encryption.decrypt_pair(row[6])
+                else:
+                    user_message = self.encryption.decrypt(row[7])
+                    ai_response = self.encryption.decrypt(row[8])
+                conv_dict.update({
+                    "user_message": user_message,
+                    "ai_response": ai_response
+                })
             
-            return history
+            history.append(conv_dict)
+        
+        return history
     
     # Goal management
     def create_goal(
@@ -309,7 +629,7 @@ class LocalDatabase:
         """Create new goal"""
         with self.get_session() as session:
             goal = Goal(
-                id=str(uuid.uuid4()),
+                id=_new_id(),
                 user_id=user_id,
                 title=title,
                 description=description,
@@ -339,7 +659,7 @@ class LocalDatabase:
                 
                 # Add progress entry
                 progress_entry = GoalProgress(
-                    id=str(uuid.uuid4()),
+                    id=_new_id(),
                     goal_id=goal_id,
                     progress_note=note,
                     progress_value=progress_percent
@@ -360,25 +680,32 @@ class LocalDatabase:
     # Analytics and summaries
     def get_session_summary(self, user_id: str, days: int = 7) -> Dict[str, Any]:
         """Get session summary for parental oversight"""
+        self._flush()
         with self.get_session() as session:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            cutoff_ts = int(time.time()) - days * 86400
             
-            sessions = session.query(ConversationSession).filter(
+            in_period = (
                 ConversationSession.user_id == user_id,
-                ConversationSession.start_time >= cutoff_date
-            ).all()
+                ConversationSession.start_ts >= cutoff_ts
+            )
             
-            total_sessions = len(sessions)
-            total_messages = sum(s.message_count for s in sessions)
-            total_duration = sum(s.duration_minutes for s in sessions)
-            emotional_support_sessions = len([s for s in sessions if s.emotional_support_triggered])
+            # Aggregate in SQL instead of loading every session row
+            (total_sessions, total_messages, total_duration,
+             emotional_support_sessions, healthy_sessions) = session.query(
+                func.count(),
+                func.coalesce(func.sum(ConversationSession.message_count), 0),
+                func.coalesce(func.sum(ConversationSession.duration_minutes), 0),
+                func.coalesce(func.sum(case((ConversationSession.emotional_support_triggered, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((ConversationSession.session_healthy, 1), else_=0)), 0)
+            ).filter(*in_period).one()
             
-            # Collect all topics
-            all_topics = []
-            for s in sessions:
-                all_topics.extend(s.get_topics())
+            # Topics are stored as JSON arrays, so only that column is fetched
+            all_topics = set()
+            for (topics,) in session.query(ConversationSession.topics).filter(*in_period):
+                if topics:
+                    all_topics.update(topics)
             
-            unique_topics = list(set(all_topics))
+            unique_topics = list(all_topics)
             
             return {
                 "period_days": days,
@@ -388,11 +715,15 @@ class LocalDatabase:
                 "emotional_support_sessions": emotional_support_sessions,
                 "topics_discussed": unique_topics,
                 "average_session_duration": total_duration / total_sessions if total_sessions > 0 else 0,
-                "healthy_sessions": len([s for s in sessions if s.session_healthy])
+                "healthy_sessions": healthy_sessions
             }
     
     async def cleanup(self):
         """Cleanup database resources"""
+        if self._flusher_task:
+            self._flusher_task.cancel()
+            self._flusher_task = None
         if self.engine:
+            await self.flush()
             self.engine.dispose()
             logger.info("Local database cleaned up")
\ No newline at end of file
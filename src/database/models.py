@@ -2,12 +2,13 @@
 Database models for heyBuddy
 Supports both SQLite (local) and Supabase (optional sync)
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Index, JSON, LargeBinary, text
+from sqlalchemy.ext.mutable import MutableDict, MutableList
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
-import json
+import time
 
 Base = declarative_base()
 
@@ -22,9 +23,9 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_active = Column(DateTime, default=datetime.utcnow)
     
-    # Settings stored as JSON
-    settings = Column(Text, default="{}")  # JSON string
-    preferences = Column(Text, default="{}")  # JSON string
+    # Settings stored as JSON; in-place changes are tracked
+    settings = Column(MutableDict.as_mutable(JSON), default=dict)
+    preferences = Column(MutableDict.as_mutable(JSON), default=dict)
     
     # Privacy settings
     parental_sync_enabled = Column(Boolean, default=False)
@@ -34,24 +35,22 @@ class User(Base):
     conversations = relationship("Conversation", back_populates="user")
     goals = relationship("Goal", back_populates="user")
     sessions = relationship("ConversationSession", back_populates="user")
-    
-    def get_settings(self) -> dict:
-        """Get user settings as dict"""
-        return json.loads(self.settings) if self.settings else {}
-    
-    def set_settings(self, settings_dict: dict):
-        """Set user settings from dict"""
-        self.settings = json.dumps(settings_dict)
 
 
 class ConversationSession(Base):
     """Conversation session tracking - local only"""
     __tablename__ = "conversation_sessions"
+    __table_args__ = (
+        Index("ix_cs_user_start", "user_id", "start_ts"),
+        # Partial index so active-session lookups skip historical sessions
+        Index("ix_cs_active", "user_id", sqlite_where=text("end_ts IS NULL")),
+    )
     
     id = Column(String, primary_key=True)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    start_time = Column(DateTime, default=datetime.utcnow)
-    end_time = Column(DateTime, nullable=True)
+    # Unix timestamps (seconds, UTC)
+    start_ts = Column(Integer, default=lambda: int(time.time()))
+    end_ts = Column(Integer, nullable=True)
     
     # Session metrics
     message_count = Column(Integer, default=0)
@@ -59,8 +58,8 @@ class ConversationSession(Base):
     emotional_support_triggered = Column(Boolean, default=False)
     
     # Topics discussed (high-level only)
-    topics = Column(Text, default="[]")  # JSON array
-    emotional_keywords = Column(Text, default="[]")  # JSON array
+    topics = Column(MutableList.as_mutable(JSON), default=list)
+    emotional_keywords = Column(MutableList.as_mutable(JSON), default=list)
     
     # Health indicators
     session_healthy = Column(Boolean, default=True)
@@ -70,27 +69,31 @@ class ConversationSession(Base):
     user = relationship("User", back_populates="sessions")
     conversations = relationship("Conversation", back_populates="session")
     
-    def get_topics(self) -> list:
-        return json.loads(self.topics) if self.topics else []
+    @property
+    def start_time(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.start_ts, tz=timezone.utc) if self.start_ts is not None else None
     
-    def add_topic(self, topic: str):
-        topics = self.get_topics()
-        if topic not in topics:
-            topics.append(topic)
-        self.topics = json.dumps(topics)
+    @property
+    def end_time(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.end_ts, tz=timezone.utc) if self.end_ts is not None else None
 
 
 class Conversation(Base):
     """Individual conversations - stored locally with privacy protection"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conv_user_time", "user_id", "timestamp"),
+    )
     
     id = Column(String, primary_key=True)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    session_id = Column(String, ForeignKey("conversation_sessions.id"), nullable=False)
+    session_id = Column(String, ForeignKey("conversation_sessions.id"), nullable=False, index=True)
     
     timestamp = Column(DateTime, default=datetime.utcnow)
     
-    # Content (encrypted for privacy)
+    # Content (encrypted for privacy): user message and AI response in one blob
+    messages_encrypted = Column(LargeBinary, nullable=True)
+    # Legacy per-message columns, only set on rows written before messages_encrypted
     user_message_encrypted = Column(Text, nullable=True)
     ai_response_encrypted = Column(Text, nullable=True)
     
@@ -155,69 +158,3 @@ class GoalProgress(Base):
     # Relationships
     goal = relationship("Goal", back_populates="progress_entries")
 
-
-# Supabase sync models (metadata only, no personal data)
-class SyncSessionSummary(Base):
-    """Session summaries for parental dashboard - safe for cloud sync"""
-    __tablename__ = "sync_session_summaries"
-    
-    id = Column(String, primary_key=True)
-    device_id = Column(String, nullable=False)  # Pi device identifier
-    user_hash = Column(String, nullable=False)  # Hashed user ID
-    
-    session_date = Column(DateTime, nullable=False)
-    duration_minutes = Column(Integer, default=0)
-    message_count = Column(Integer, default=0)
-    
-    # Safe metadata only
-    topics_count = Column(Integer, default=0)
-    emotional_support = Column(Boolean, default=False)
-    safety_warnings = Column(Integer, default=0)
-    session_healthy = Column(Boolean, default=True)
-    
-    # General content categories (no specific content)
-    content_categories = Column(Text, default="[]")  # JSON array
-    
-    sync_timestamp = Column(DateTime, default=datetime.utcnow)
-
-
-class SyncGoalSummary(Base):
-    """Goal summaries for parental dashboard"""
-    __tablename__ = "sync_goal_summaries"
-    
-    id = Column(String, primary_key=True)
-    device_id = Column(String, nullable=False)
-    user_hash = Column(String, nullable=False)
-    
-    goal_title = Column(String, nullable=False)
-    goal_category = Column(String, nullable=True)
-    status = Column(String, nullable=False)
-    progress_percent = Column(Integer, default=0)
-    
-    created_date = Column(DateTime, nullable=False)
-    target_date = Column(DateTime, nullable=True)
-    completed_date = Column(DateTime, nullable=True)
-    
-    sync_timestamp = Column(DateTime, default=datetime.utcnow)
-
-
-class DeviceStatus(Base):
-    """Device status for parental monitoring"""
-    __tablename__ = "device_status"
-    
-    device_id = Column(String, primary_key=True)
-    device_name = Column(String, nullable=True)
-    
-    last_seen = Column(DateTime, default=datetime.utcnow)
-    software_version = Column(String, nullable=True)
-    
-    # Health metrics
-    uptime_hours = Column(Float, default=0)
-    audio_device_status = Column(String, default="unknown")
-    ai_service_status = Column(String, default="unknown")
-    
-    # Usage metrics (anonymized)
-    daily_active_users = Column(Integer, default=0)
-    total_conversations_today = Column(Integer, default=0)
-    
-    sync_timestamp = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -4,16 +4,107 @@ Syncs only anonymized metadata, never personal conversations
 """
 import logging
 import asyncio
+import functools
 import hashlib
 import json
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+import re
+import time
+from dataclasses import asdict, dataclass, field, is_dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import httpx
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
 from core.config import settings
+from database.models import Conversation, ConversationSession, Goal
+
+try:
+    import h2  # optional: enables HTTP/2 in httpx
+except ImportError:
+    h2 = None
+
+try:
+    import orjson  # optional: faster JSON encode/decode
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _dumps_bytes = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
+    def _json_default(obj):
+        """Encode payload dataclasses and datetimes like orjson does"""
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        if is_dataclass(obj):
+            return asdict(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _dumps_bytes(obj) -> bytes:
+        return json.dumps(obj, default=_json_default).encode()
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=256)
+def _salted_user_hash(device_id: str, user_id: str) -> str:
+    """SHA-256 of the user ID salted with the device ID, computed once per user"""
+    # Add device salt for extra privacy
+    salted = f"{device_id}-{user_id}"
+    return hashlib.sha256(salted.encode()).hexdigest()[:16]
+
+
+@dataclass(slots=True)
+class SessionSummaryPayload:
+    """Anonymized session summary row sent to Supabase"""
+    device_id: str
+    user_hash: str
+    session_date: datetime
+    duration_minutes: int = 0
+    message_count: int = 0
+    topics_count: int = 0
+    emotional_support: bool = False
+    safety_warnings: int = 0
+    session_healthy: bool = True
+    content_categories: str = "[]"  # JSON-encoded list
+    sync_timestamp: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass(slots=True)
+class GoalSummaryPayload:
+    """Anonymized goal summary row sent to Supabase"""
+    device_id: str
+    user_hash: str
+    goal_title: str
+    goal_category: Optional[str]
+    status: str
+    progress_percent: int
+    created_date: datetime
+    target_date: Optional[datetime] = None
+    completed_date: Optional[datetime] = None
+    sync_timestamp: datetime = field(default_factory=datetime.utcnow)
+
+
+# Topic keywords per content category, in priority order
+_TOPIC_CATEGORIES = (
+    (("story", "tale", "adventure"), "storytelling"),
+    (("scared", "afraid", "worry", "emotion"), "emotional_support"),
+    (("school", "homework", "learn"), "education"),
+    (("play", "game", "fun"), "play"),
+)
+_TOPIC_CATEGORY_PRIORITY = {
+    keyword: priority
+    for priority, (keywords, _category) in enumerate(_TOPIC_CATEGORIES)
+    for keyword in keywords
+}
+# Lookahead so overlapping keywords are all reported
+_TOPIC_CATEGORY_RE = re.compile(f"(?=({'|'.join(_TOPIC_CATEGORY_PRIORITY)}))")
+
+
 class SupabaseSync:
     """Manages sync of anonymized data to Supabase for parental dashboard"""
     
@@ -22,9 +113,31 @@ class SupabaseSync:
         self.supabase_key = supabase_key or getattr(settings, 'supabase_key', None)
         self.device_id = self._get_device_id()
         self.enabled = bool(self.supabase_url and self.supabase_key)
+        self._client: Optional[httpx.AsyncClient] = None
         
         if not self.enabled:
             logger.info("Supabase sync disabled - no credentials provided")
+            return
+        
+        # One pooled client so requests reuse connections (and TLS sessions)
+        self._client = httpx.AsyncClient(
+            base_url=f"{self.supabase_url}/rest/v1/",
+            headers={
+                "apikey": self.supabase_key,
+                "Authorization": f"Bearer {self.supabase_key}",
+                "Content-Type": "application/json",
+                "Prefer": "return=minimal"
+            },
+            timeout=10.0,
+            http2=h2 is not None,
+            limits=httpx.Limits(max_keepalive_connections=4, max_connections=8)
+        )
+    
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     def _get_device_id(self) -> str:
         """Get unique device identifier"""
@@ -38,130 +151,144 @@ class SupabaseSync:
     
     def _hash_user_id(self, user_id: str) -> str:
         """Create privacy-safe hash of user ID"""
-        # Add device salt for extra privacy
-        salted = f"{self.device_id}-{user_id}"
-        return hashlib.sha256(salted.encode()).hexdigest()[:16]
+        return _salted_user_hash(self.device_id, user_id)
     
-    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Optional[Dict]:
-        """Make HTTP request to Supabase"""
-        if not self.enabled:
+    async def _make_request(self, method: str, endpoint: str, data: Optional[Any] = None) -> Optional[Any]:
+        """Make HTTP request to Supabase; a list body inserts several rows at once"""
+        if not self.enabled or self._client is None:
             return None
         
-        url = f"{self.supabase_url}/rest/v1/{endpoint}"
-        headers = {
-            "apikey": self.supabase_key,
-            "Authorization": f"Bearer {self.supabase_key}",
-            "Content-Type": "application/json",
-            "Prefer": "return=minimal"
-        }
+        method = method.upper()
+        if method not in ("POST", "PATCH", "GET"):
+            logger.error(f"Unsupported HTTP method: {method}")
+            return None
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                if method.upper() == "POST":
-                    response = await client.post(url, headers=headers, json=data)
-                elif method.upper() == "PATCH":
-                    response = await client.patch(url, headers=headers, json=data)
-                elif method.upper() == "GET":
-                    response = await client.get(url, headers=headers)
-                else:
-                    logger.error(f"Unsupported HTTP method: {method}")
-                    return None
+            # Encode the body ourselves rather than via httpx's stdlib json
+            content = _dumps_bytes(data) if method != "GET" else None
+            response = await self._client.request(method, endpoint, content=content)
+            
+            if response.status_code in [200, 201, 204]:
+                return _loads(response.content) if response.content else {}
+            else:
+                logger.error(f"Supabase request failed: {response.status_code} - {response.text}")
+                return None
                 
-                if response.status_code in [200, 201, 204]:
-                    return response.json() if response.content else {}
-                else:
-                    logger.error(f"Supabase request failed: {response.status_code} - {response.text}")
-                    return None
-                    
         except Exception as e:
             logger.error(f"Supabase request error: {e}")
             return None
     
+    def build_session_summary(self, user_id: str, session_data: Dict[str, Any]) -> SessionSummaryPayload:
+        """Create privacy-safe session summary row"""
+        now = datetime.utcnow()
+        return SessionSummaryPayload(
+            device_id=self.device_id,
+            user_hash=self._hash_user_id(user_id),
+            session_date=session_data.get("start_time") or now,
+            duration_minutes=session_data.get("duration_minutes", 0),
+            message_count=session_data.get("message_count", 0),
+            topics_count=session_data.get("topics_count", len(session_data.get("topics", []))),
+            emotional_support=session_data.get("emotional_support_triggered", False),
+            safety_warnings=session_data.get("safety_warnings", 0),
+            session_healthy=session_data.get("session_healthy", True),
+            content_categories=_dumps(session_data.get("content_categories", [])),
+            sync_timestamp=now
+        )
+    
     async def sync_session_summary(
         self,
         user_id: str,
         session_data: Dict[str, Any]
     ) -> bool:
         """Sync anonymized session summary"""
+        return await self.sync_session_summaries_bulk([self.build_session_summary(user_id, session_data)])
+    
+    async def sync_session_summaries_bulk(self, summaries: List[SessionSummaryPayload]) -> bool:
+        """Insert many session summaries with one request (PostgREST bulk insert)"""
         if not self.enabled:
             return False
+        if not summaries:
+            return True
         
-        # Create privacy-safe summary
-        summary = {
-            "device_id": self.device_id,
-            "user_hash": self._hash_user_id(user_id),
-            "session_date": session_data.get("start_time", datetime.utcnow()).isoformat(),
-            "duration_minutes": session_data.get("duration_minutes", 0),
-            "message_count": session_data.get("message_count", 0),
-            "topics_count": len(session_data.get("topics", [])),
-            "emotional_support": session_data.get("emotional_support_triggered", False),
-            "safety_warnings": session_data.get("safety_warnings", 0),
-            "session_healthy": session_data.get("session_healthy", True),
-            "content_categories": json.dumps(session_data.get("content_categories", [])),
-            "sync_timestamp": datetime.utcnow().isoformat()
-        }
-        
-        result = await self._make_request("POST", "sync_session_summaries", summary)
+        result = await self._make_request("POST", "sync_session_summaries", summaries)
         success = result is not None
         
         if success:
-            logger.info(f"Synced session summary for user hash {summary['user_hash']}")
+            logger.info(f"Synced {len(summaries)} session summaries")
         
         return success
     
+    def build_goal_summary(self, user_id: str, goal_data: Dict[str, Any]) -> GoalSummaryPayload:
+        """Create privacy-safe goal summary row"""
+        now = datetime.utcnow()
+        return GoalSummaryPayload(
+            device_id=self.device_id,
+            user_hash=self._hash_user_id(user_id),
+            goal_title=goal_data.get("title", "")[:50],  # Truncate for privacy
+            goal_category=goal_data.get("category"),
+            status=goal_data.get("status", "active"),
+            progress_percent=goal_data.get("progress_percent", 0),
+            created_date=goal_data.get("created_at") or now,
+            target_date=goal_data.get("target_date"),
+            completed_date=goal_data.get("completed_at"),
+            sync_timestamp=now
+        )
+    
     async def sync_goal_summary(
         self,
         user_id: str,
         goal_data: Dict[str, Any]
     ) -> bool:
         """Sync anonymized goal summary"""
+        return await self.sync_goal_summaries_bulk([self.build_goal_summary(user_id, goal_data)])
+    
+    async def sync_goal_summaries_bulk(self, goal_summaries: List[GoalSummaryPayload]) -> bool:
+        """Insert many goal summaries with one request (PostgREST bulk insert)"""
         if not self.enabled:
             return False
+        if not goal_summaries:
+            return True
         
-        # Create privacy-safe goal summary
-        goal_summary = {
-            "device_id": self.device_id,
-            "user_hash": self._hash_user_id(user_id),
-            "goal_title": goal_data.get("title", "")[:50],  # Truncate for privacy
-            "goal_category": goal_data.get("category"),
-            "status": goal_data.get("status", "active"),
-            "progress_percent": goal_data.get("progress_percent", 0),
-            "created_date": goal_data.get("created_at", datetime.utcnow()).isoformat(),
-            "target_date": goal_data.get("target_date").isoformat() if goal_data.get("target_date") else None,
-            "completed_date": goal_data.get("completed_at").isoformat() if goal_data.get("completed_at") else None,
-            "sync_timestamp": datetime.utcnow().isoformat()
-        }
-        
-        result = await self._make_request("POST", "sync_goal_summaries", goal_summary)
+        result = await self._make_request("POST", "sync_goal_summaries", goal_summaries)
         success = result is not None
         
         if success:
-            logger.info(f"Synced goal summary: {goal_summary['goal_title']}")
+            logger.info(f"Synced {len(goal_summaries)} goal summaries")
         
         return success
     
-    async def sync_device_status(
+    def build_device_status(
         self,
         device_name: Optional[str] = None,
         software_version: Optional[str] = None,
         health_metrics: Optional[Dict[str, Any]] = None
-    ) -> bool:
-        """Sync device status for monitoring"""
-        if not self.enabled:
-            return False
-        
-        status = {
+    ) -> Dict[str, Any]:
+        """Create device status row (timestamps are formatted by the serializer)"""
+        now = datetime.utcnow()
+        return {
             "device_id": self.device_id,
             "device_name": device_name or f"heyBuddy-{self.device_id[:8]}",
-            "last_seen": datetime.utcnow().isoformat(),
+            "last_seen": now,
             "software_version": software_version or settings.version,
             "uptime_hours": health_metrics.get("uptime_hours", 0) if health_metrics else 0,
             "audio_device_status": health_metrics.get("audio_status", "unknown") if health_metrics else "unknown",
             "ai_service_status": health_metrics.get("ai_status", "unknown") if health_metrics else "unknown",
             "daily_active_users": health_metrics.get("daily_users", 0) if health_metrics else 0,
             "total_conversations_today": health_metrics.get("conversations_today", 0) if health_metrics else 0,
-            "sync_timestamp": datetime.utcnow().isoformat()
+            "sync_timestamp": now
         }
+    
+    async def sync_device_status(
+        self,
+        device_name: Optional[str] = None,
+        software_version: Optional[str] = None,
+        health_metrics: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Sync device status for monitoring"""
+        if not self.enabled:
+            return False
+        
+        status = self.build_device_status(device_name, software_version, health_metrics)
         
         # Use PATCH to update existing device or POST to create new
         result = await self._make_request("POST", "device_status", status)
@@ -233,110 +360,128 @@ class SupabaseSync:
 class SyncManager:
     """Manages sync operations between local DB and Supabase"""
     
+    # Uptime and daily counts need no more than minute precision
+    METRICS_TTL_SECONDS = 60
+    
+    # Upper bound per pending buffer while Supabase is unreachable; oldest dropped first
+    MAX_PENDING = 500
+    
     def __init__(self, local_db, supabase_sync: SupabaseSync):
         self.local_db = local_db
         self.supabase = supabase_sync
         self.sync_enabled = supabase_sync.enabled
         self.last_sync = None
         
+        # Summaries waiting for the next periodic_sync bulk upload
+        self._pending_sessions: List[SessionSummaryPayload] = []
+        self._pending_goals: List[GoalSummaryPayload] = []
+        
+        # Health metric name -> (monotonic time computed, value)
+        self._metrics_cache: Dict[str, Tuple[float, Any]] = {}
+        
     async def sync_user_session(self, user_id: str, session_id: str) -> bool:
-        """Sync completed session to cloud"""
+        """Queue completed session for the next cloud sync
+        
+        Returns True once the summary is queued; the upload itself happens in
+        periodic_sync/flush_pending, so True does not mean it reached Supabase.
+        """
         if not self.sync_enabled:
             return False
         
         try:
             # Get session from local DB
             with self.local_db.get_session() as session:
-                conv_session = session.query(ConversationSession).filter(
-                    ConversationSession.id == session_id
-                ).first()
+                conv_session = session.query(ConversationSession).options(
+                    joinedload(ConversationSession.user)
+                ).filter(ConversationSession.id == session_id).first()
                 
                 if not conv_session:
                     return False
                 
                 # Check if user has sync enabled
-                user = session.query(User).filter(User.id == user_id).first()
+                user = conv_session.user
                 if not user or not user.parental_sync_enabled:
                     logger.info(f"Sync disabled for user {user_id}")
                     return False
                 
-                # Prepare session data for sync
-                session_data = {
-                    "start_time": conv_session.start_time,
-                    "duration_minutes": conv_session.duration_minutes,
-                    "message_count": conv_session.message_count,
-                    "topics": conv_session.get_topics(),
-                    "emotional_support_triggered": conv_session.emotional_support_triggered,
-                    "safety_warnings": conv_session.safety_warnings,
-                    "session_healthy": conv_session.session_healthy,
-                    "content_categories": self._extract_content_categories(conv_session)
-                }
+                # Topics are deserialized once by the JSON column and reused
+                topics = conv_session.topics or []
                 
-                # Sync to Supabase
-                success = await self.supabase.sync_session_summary(user_id, session_data)
-                return success
+                # Uploaded in bulk by periodic_sync
+                self._enqueue(self._pending_sessions, SessionSummaryPayload(
+                    device_id=self.supabase.device_id,
+                    user_hash=self.supabase._hash_user_id(user_id),
+                    session_date=conv_session.start_time,
+                    duration_minutes=conv_session.duration_minutes,
+                    message_count=conv_session.message_count,
+                    topics_count=len(topics),
+                    emotional_support=conv_session.emotional_support_triggered,
+                    safety_warnings=conv_session.safety_warnings,
+                    session_healthy=conv_session.session_healthy,
+                    content_categories=_dumps(self._extract_content_categories(topics))
+                ), "session")
+                return True
                 
         except Exception as e:
             logger.error(f"Error syncing user session: {e}")
             return False
     
     async def sync_user_goal(self, user_id: str, goal_id: str) -> bool:
-        """Sync goal to cloud"""
+        """Queue goal for the next cloud sync
+        
+        Returns True once the summary is queued, same contract as sync_user_session.
+        """
         if not self.sync_enabled:
             return False
         
         try:
             # Get goal from local DB
             with self.local_db.get_session() as session:
-                goal = session.query(Goal).filter(Goal.id == goal_id).first()
+                goal = session.query(Goal).options(
+                    joinedload(Goal.user)
+                ).filter(Goal.id == goal_id).first()
                 
                 if not goal or not goal.sync_to_parent:
                     return False
                 
                 # Check if user has sync enabled
-                user = session.query(User).filter(User.id == user_id).first()
+                user = goal.user
                 if not user or not user.parental_sync_enabled:
                     return False
                 
-                # Prepare goal data for sync
-                goal_data = {
-                    "title": goal.title,
-                    "category": goal.category,
-                    "status": goal.status,
-                    "progress_percent": goal.progress_percent,
-                    "created_at": goal.created_at,
-                    "target_date": goal.target_date,
-                    "completed_at": goal.completed_at
-                }
-                
-                # Sync to Supabase
-                success = await self.supabase.sync_goal_summary(user_id, goal_data)
-                return success
+                # Uploaded in bulk by periodic_sync
+                self._enqueue(self._pending_goals, GoalSummaryPayload(
+                    device_id=self.supabase.device_id,
+                    user_hash=self.supabase._hash_user_id(user_id),
+                    goal_title=goal.title[:50],  # Truncate for privacy
+                    goal_category=goal.category,
+                    status=goal.status,
+                    progress_percent=goal.progress_percent,
+                    created_date=goal.created_at,
+                    target_date=goal.target_date,
+                    completed_date=goal.completed_at
+                ), "goal")
+                return True
                 
         except Exception as e:
             logger.error(f"Error syncing goal: {e}")
             return False
     
-    def _extract_content_categories(self, session) -> List[str]:
-        """Extract general content categories from session"""
+    def _extract_content_categories(self, topics: List[str]) -> List[str]:
+        """Extract general content categories from session topics"""
         # This would analyze conversation metadata to determine categories
         # without exposing actual content
-        categories = []
+        categories = set()
         
-        topics = session.get_topics()
         for topic in topics:
-            if any(keyword in topic.lower() for keyword in ["story", "tale", "adventure"]):
-                categories.append("storytelling")
-            elif any(keyword in topic.lower() for keyword in ["scared", "afraid", "worry", "emotion"]):
-                categories.append("emotional_support")
-            elif any(keyword in topic.lower() for keyword in ["school", "homework", "learn"]):
-                categories.append("education")
-            elif any(keyword in topic.lower() for keyword in ["play", "game", "fun"]):
-                categories.append("play")
+            matches = _TOPIC_CATEGORY_RE.findall(topic.lower())
+            if matches:
+                _keywords, category = _TOPIC_CATEGORIES[min(_TOPIC_CATEGORY_PRIORITY[m] for m in matches)]
+                categories.add(category)
             else:
-                categories.append("general")
+                categories.add("general")
         
-        return list(set(categories))
+        return list(categories)
     
     async def periodic_sync(self):
         """Perform periodic sync of device status"""
@@ -346,13 +491,14 @@ class SyncManager:
         try:
             # Collect health metrics
             health_metrics = {
-                "uptime_hours": self._get_uptime_hours(),
+                "uptime_hours": self._cached_metric("uptime_hours", self._get_uptime_hours),
                 "audio_status": "healthy",  # Would check actual audio status
                 "ai_status": "healthy",     # Would check AI service status
-                "daily_users": self._get_daily_user_count(),
-                "conversations_today": self._get_daily_conversation_count()
+                "daily_users": self._cached_metric("daily_users", self._get_daily_user_count),
+                "conversations_today": self._cached_metric("conversations_today", self._get_daily_conversation_count)
             }
             
+            await self.flush_pending()
             await self.supabase.sync_device_status(
                 health_metrics=health_metrics
             )
@@ -363,6 +509,50 @@ class SyncManager:
         except Exception as e:
             logger.error(f"Periodic sync error: {e}")
     
+    async def close(self):
+        """Upload queued summaries, then close the Supabase client"""
+        if self.sync_enabled:
+            try:
+                await self.flush_pending()
+            except Exception as e:
+                logger.error(f"Final sync flush failed: {e}")
+        await self.supabase.aclose()
+    
+    async def flush_pending(self):
+        """Upload queued session and goal summaries, one request per endpoint"""
+        sessions, self._pending_sessions = self._pending_sessions, []
+        if sessions and not await self.supabase.sync_session_summaries_bulk(sessions):
+            # Keep them for the next attempt
+            self._pending_sessions[:0] = sessions
+            self._trim_pending(self._pending_sessions, "session")
+        
+        goals, self._pending_goals = self._pending_goals, []
+        if goals and not await self.supabase.sync_goal_summaries_bulk(goals):
+            self._pending_goals[:0] = goals
+            self._trim_pending(self._pending_goals, "goal")
+    
+    def _enqueue(self, pending: List[Any], payload: Any, kind: str):
+        """Append a summary to a pending buffer, keeping it within MAX_PENDING"""
+        pending.append(payload)
+        self._trim_pending(pending, kind)
+    
+    def _trim_pending(self, pending: List[Any], kind: str):
+        """Drop the oldest queued summaries beyond MAX_PENDING"""
+        overflow = len(pending) - self.MAX_PENDING
+        if overflow > 0:
+            del pending[:overflow]
+            logger.warning(f"Sync backlog full, dropped {overflow} oldest {kind} summaries")
+    
+    def _cached_metric(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Return a health metric, recomputing it at most once per METRICS_TTL_SECONDS"""
+        now = time.monotonic()
+        cached = self._metrics_cache.get(name)
+        if cached is not None and now - cached[0] < self.METRICS_TTL_SECONDS:
+            return cached[1]
+        value = compute()
+        self._metrics_cache[name] = (now, value)
+        return value
+    
     def _get_uptime_hours(self) -> float:
         """Get system uptime in hours"""
         try:
@@ -375,11 +565,13 @@ class SyncManager:
     def _get_daily_user_count(self) -> int:
         """Get number of active users today"""
         try:
-            today = datetime.utcnow().date()
+            today_ts = int(datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+                           .replace(tzinfo=timezone.utc).timestamp())
             with self.local_db.get_session() as session:
-                count = session.query(ConversationSession).filter(
-                    ConversationSession.start_time >= today
-                ).distinct(ConversationSession.user_id).count()
+                count = session.execute(
+                    select(func.count(func.distinct(ConversationSession.user_id)))
+                    .where(ConversationSession.start_ts >= today_ts)
+                ).scalar()
                 return count
         except:
             return 0
@@ -389,9 +581,10 @@ class SyncManager:
         try:
             today = datetime.utcnow().date()
             with self.local_db.get_session() as session:
-                count = session.query(Conversation).filter(
-                    Conversation.timestamp >= today
-                ).count()
+                count = session.execute(
+                    select(func.count()).select_from(Conversation)
+                    .where(Conversation.timestamp >= today)
+                ).scalar()
                 return count
         except:
             return 0
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Core tables mirroring the Supabase sync schema for heyBuddy
+Metadata only, no personal data. These rows are write-only payloads, so
+they are plain Core tables rather than ORM-mapped classes.
+"""
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, JSON, String, Table, Text
+
+from database.models import Base
+
+# Session summaries for parental dashboard - safe for cloud sync
+sync_session_summaries = Table(
+    "sync_session_summaries",
+    Base.metadata,
+    Column("id", String, primary_key=True),
+    Column("device_id", String, nullable=False),  # Pi device identifier
+    Column("user_hash", String, nullable=False),  # Hashed user ID
+    
+    Column("session_date", DateTime, nullable=False),
+    Column("duration_minutes", Integer, default=0),
+    Column("message_count", Integer, default=0),
+    
+    # Safe metadata only
+    Column("topics_count", Integer, default=0),
+    Column("emotional_support", Boolean, default=False),
+    Column("safety_warnings", Integer, default=0),
+    Column("session_healthy", Boolean, default=True),
+    
+    # General content categories (no specific content)
+    Column("content_categories", Text, default="[]"),  # JSON array
+    
+    Column("sync_timestamp", DateTime, default=datetime.utcnow),
+    Index("ix_sess_device_date", "device_id", "session_date"),
+)
+
+# Goal summaries for parental dashboard
+sync_goal_summaries = Table(
+    "sync_goal_summaries",
+    Base.metadata,
+    Column("id", String, primary_key=True),
+    Column("device_id", String, nullable=False),
+    Column("user_hash", String, nullable=False),
+    
+    Column("goal_title", String, nullable=False),
+    Column("goal_category", String, nullable=True),
+    Column("status", String, nullable=False),
+    Column("progress_percent", Integer, default=0),
+    
+    Column("created_date", DateTime, nullable=False),
+    Column("target_date", DateTime, nullable=True),
+    Column("completed_date", DateTime, nullable=True),
+    
+    Column("sync_timestamp", DateTime, default=datetime.utcnow),
+    Index("ix_goal_device_created", "device_id", "created_date"),
+)
+
+# Device status for parental monitoring
+device_status = Table(
+    "device_status",
+    Base.metadata,
+    Column("device_id", String, primary_key=True),
+    Column("device_name", String, nullable=True),
+    
+    Column("last_seen", DateTime, default=datetime.utcnow),
+    Column("software_version", String, nullable=True),
+    
+    # Health metrics
+    Column("uptime_hours", Float, default=0),
+    Column("audio_device_status", String, default="unknown"),
+    Column("ai_service_status", String, default="unknown"),
+    
+    # Usage metrics (anonymized)
+    Column("daily_active_users", Integer, default=0),
+    Column("total_conversations_today", Integer, default=0),
+    
+    Column("sync_timestamp", DateTime, default=datetime.utcnow),
+)
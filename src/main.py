@@ -3,11 +3,20 @@
 heyBuddy AI Companion - Main Application Entry Point
 """
 import asyncio
+import contextlib
 import logging
+import os
 import signal
 import sys
 from pathlib import Path
 
+import uvicorn
+
+try:
+    import uvloop
+except ImportError:  # e.g. Windows development machines
+    uvloop = None
+
 # Add src to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
@@ -15,6 +24,20 @@ from core.config import settings
 from core.audio import AudioManager
 from api.app import create_app
 from database.local_db import LocalDatabase
+from database.supabase_sync import SupabaseSync, SyncManager
+
+
+class _AppServer(uvicorn.Server):
+    """uvicorn server that leaves signal handling to HeyBuddyApp"""
+    
+    def install_signal_handlers(self):
+        # uvicorn < 0.29
+        pass
+    
+    @contextlib.contextmanager
+    def capture_signals(self):
+        # uvicorn >= 0.29
+        yield
 
 
 class HeyBuddyApp:
@@ -23,8 +46,17 @@ class HeyBuddyApp:
     def __init__(self):
         self.audio_manager: AudioManager = None
         self.database: LocalDatabase = None
+        self.sync_manager: SyncManager = None
         self.api_server = None
         self.running = False
+        self._server: uvicorn.Server = None
+        # Set to wake the health monitor early (shutdown or audio activity)
+        self._wake: asyncio.Event = None
+        # systemd.daemon.notify, bound once in initialize() when enabled and available
+        self._sd_notify = None
+        self._health_interval = settings.health_check_interval
+        self._health_interval_max = max(settings.health_check_interval_max, self._health_interval)
+        self._current_health_interval = self._health_interval
         self.setup_logging()
         
     def setup_logging(self):
@@ -58,6 +90,9 @@ class HeyBuddyApp:
                 self.logger.error("Failed to initialize database")
                 return False
             
+            # Cloud sync; disabled (no HTTP client) without Supabase credentials
+            self.sync_manager = SyncManager(self.database, SupabaseSync())
+            
             # Initialize audio manager
             self.logger.info("Initializing audio system...")
             self.audio_manager = AudioManager(
@@ -77,11 +112,19 @@ class HeyBuddyApp:
             if settings.enable_systemd_notify:
                 try:
                     import systemd.daemon
-                    systemd.daemon.notify('READY=1')
-                    systemd.daemon.notify('STATUS=heyBuddy is ready')
+                    self._sd_notify = systemd.daemon.notify
+                    # One datagram carries several newline-separated assignments
+                    self._sd_notify('READY=1\nSTATUS=heyBuddy is ready')
                     self.logger.info("Notified systemd of successful startup")
                 except ImportError:
                     self.logger.warning("systemd-python not available")
+                
+                # Ping the watchdog at least twice per WatchdogSec
+                watchdog_usec = os.getenv("WATCHDOG_USEC")
+                if watchdog_usec:
+                    watchdog_interval = int(watchdog_usec) / 2e6
+                    self._health_interval = min(self._health_interval, watchdog_interval)
+                    self._health_interval_max = min(self._health_interval_max, watchdog_interval)
             
             self.logger.info("heyBuddy initialization completed successfully")
             return True
@@ -91,62 +134,92 @@ class HeyBuddyApp:
             return False
     
     async def start_health_monitor(self):
-        """Start health monitoring task"""
+        """Start health monitoring task
+        
+        Checks run every health_check_interval while audio is in use or the
+        device is unhealthy, and back off exponentially (up to
+        health_check_interval_max) while the device is healthy and idle.
+        """
+        audio_manager = self.audio_manager
+        audio_manager.activity_callback = self.request_health_check
+        check_device = audio_manager.is_device_available
+        idle_seconds = audio_manager.idle_seconds
+        notify = self._sd_notify
         while self.running:
             try:
                 # Check audio device health
-                audio_ok = await self.audio_manager.is_device_available()
+                audio_ok = await check_device()
                 
                 # Update systemd status if enabled
-                if settings.enable_systemd_notify:
-                    try:
-                        import systemd.daemon
-                        if audio_ok:
-                            systemd.daemon.notify('WATCHDOG=1')
-                            systemd.daemon.notify('STATUS=All systems operational')
-                        else:
-                            systemd.daemon.notify('STATUS=Audio device unavailable')
-                            self.logger.warning("Audio device health check failed")
-                    except ImportError:
-                        pass
+                if notify:
+                    if audio_ok:
+                        notify('WATCHDOG=1\nSTATUS=All systems operational')
+                    else:
+                        notify('STATUS=Audio device unavailable')
+                        self.logger.warning("Audio device health check failed")
+                
+                interval = self._current_health_interval
+                if audio_ok and idle_seconds() >= interval:
+                    self._current_health_interval = min(interval * 2, self._health_interval_max)
+                else:
+                    self._current_health_interval = self._health_interval
                 
-                await asyncio.sleep(settings.health_check_interval)
+                await self._wait_for_wake(self._current_health_interval)
                 
             except Exception as e:
                 self.logger.error(f"Health check error: {e}")
-                await asyncio.sleep(settings.health_check_interval)
+                self._current_health_interval = self._health_interval
+                await self._wait_for_wake(self._current_health_interval)
+    
+    def request_health_check(self):
+        """Run the next health check now if the monitor has backed off"""
+        if self._wake and self._current_health_interval > self._health_interval:
+            self._wake.set()
+    
+    async def _wait_for_wake(self, timeout: float):
+        """Sleep for timeout seconds, waking early on shutdown or request_health_check()"""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+    
+    async def _serve(self):
+        """Run the API server; stop the rest of the app when it exits"""
+        try:
+            await self._server.serve()
+        finally:
+            self.running = False
+            self._wake.set()
     
     async def run(self):
         """Main application run loop"""
         self.running = True
+        self._wake = asyncio.Event()
         
-        # Setup signal handlers
+        # Setup signal handlers (run on the event loop, not mid-callback)
+        loop = asyncio.get_running_loop()
         for sig in (signal.SIGTERM, signal.SIGINT):
-            signal.signal(sig, self.signal_handler)
+            loop.add_signal_handler(sig, self.signal_handler, sig, None)
         
         try:
-            # Start health monitoring
-            health_task = asyncio.create_task(self.start_health_monitor())
-            
             # Start API server
-            import uvicorn
             config = uvicorn.Config(
                 self.api_server,
                 host=settings.api_host,
                 port=settings.api_port,
                 log_level=settings.log_level.lower(),
-                access_log=True
+                access_log=True,
+                timeout_graceful_shutdown=settings.shutdown_timeout
             )
-            server = uvicorn.Server(config)
+            self._server = _AppServer(config)
             
             self.logger.info(f"Starting API server on {settings.api_host}:{settings.api_port}")
             
-            # Run server and health monitor concurrently
-            await asyncio.gather(
-                server.serve(),
-                health_task,
-                return_exceptions=True
-            )
+            # Run server and health monitor concurrently; either failing cancels the other
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._serve())
+                tg.create_task(self.start_health_monitor())
             
         except Exception as e:
             self.logger.error(f"Application error: {e}")
@@ -156,17 +229,21 @@ class HeyBuddyApp:
     
     def signal_handler(self, signum, frame):
         """Handle shutdown signals"""
+        if not self.running and self._server:
+            # Second signal: skip waiting for open connections
+            self._server.force_exit = True
+            return
+        
         self.logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.running = False
+        if self._wake:
+            self._wake.set()
+        if self._server:
+            self._server.should_exit = True
         
         # Notify systemd of shutdown
-        if settings.enable_systemd_notify:
-            try:
-                import systemd.daemon
-                systemd.daemon.notify('STOPPING=1')
-                systemd.daemon.notify('STATUS=Shutting down')
-            except ImportError:
-                pass
+        if self._sd_notify:
+            self._sd_notify('STOPPING=1\nSTATUS=Shutting down')
     
     async def cleanup(self):
         """Cleanup resources"""
@@ -175,6 +252,9 @@ class HeyBuddyApp:
         if self.audio_manager:
             await self.audio_manager.cleanup()
         
+        if self.sync_manager:
+            await self.sync_manager.close()
+        
         if self.database:
             await self.database.cleanup()
         
@@ -200,4 +280,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # serve() runs inside our loop, so uvicorn's loop="uvloop" option would not
+    # apply; install uvloop here instead
+    if uvloop is not None:
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
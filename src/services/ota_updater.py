@@ -8,18 +8,183 @@ import json
 import hashlib
 import logging
 import asyncio
-import aiofiles
+import functools
+import grp
+import pwd
+import queue
+import stat
 import aiohttp
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, Any
+from packaging.version import InvalidVersion, Version
 import subprocess
 import shutil
+import tarfile
 import tempfile
 from core.config import settings
 
+try:
+    from pystemd.systemd1 import Manager as SystemdManager, Unit as SystemdUnit  # optional D-Bus client
+except ImportError:
+    SystemdManager = SystemdUnit = None
+
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+WRITE_BUFFER_SIZE = 1 << 20
+WRITE_QUEUE_SIZE = 32
+# How often a producer blocked on a full queue re-checks that the writer is alive
+WRITER_CHECK_SECONDS = 0.5
+
+# Top-level entries apply_update keeps; config is merged with the new release
+PRESERVED_ON_UPDATE = frozenset(("data", "logs", "config"))
+USER_DATA = frozenset(("data", "logs"))
+
+# Top-level entries that are modified in place (live DB, config merged by
+# apply_update), so backups need real copies rather than shared inodes
+COPY_ON_BACKUP = PRESERVED_ON_UPDATE
+
+# Post-update readiness probe: poll with exponential backoff until the deadline
+HEALTH_CHECK_DEADLINE = 40.0  # previous worst case: 10 s sleep + 30 s timeout
+HEALTH_POLL_INITIAL = 0.2
+HEALTH_POLL_MAX = 5.0
+HEALTH_REQUEST_TIMEOUT = 2.0
+
+SERVICE_UNIT = "heybuddy.service"
+UNIT_JOB_TIMEOUT = 90.0  # systemd's default TimeoutStartSec/TimeoutStopSec
+
+
+def _writer_loop(path: Path, chunks: "queue.Queue[Optional[bytes]]", digest) -> None:
+    """Hash and write queued chunks until a None sentinel arrives (runs in a worker thread)"""
+    error = None
+    get, update = chunks.get, digest.update
+    with open(path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        write = f.write
+        while (chunk := get()) is not None:
+            # hashlib releases the GIL for large buffers, so this overlaps network reads
+            update(chunk)
+            if error is None:
+                try:
+                    write(chunk)
+                except OSError as e:
+                    # Keep draining so the producer never blocks on a full queue
+                    error = e
+    if error is not None:
+        raise error
+
+
+async def _put_chunk(chunks: "queue.Queue[Optional[bytes]]", item: Optional[bytes], writer: asyncio.Task) -> None:
+    """Queue an item for the writer thread, failing instead of blocking if the writer has died"""
+    while True:
+        if writer.done():
+            # Re-raise the writer's error; a writer that returned early is a bug too
+            writer.result()
+            raise RuntimeError("Download writer stopped before the end of the stream")
+        try:
+            chunks.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        try:
+            # Disk is slower than the network; wait without blocking the loop,
+            # waking regularly to re-check the writer
+            await asyncio.to_thread(chunks.put, item, True, WRITER_CHECK_SECONDS)
+            return
+        except queue.Full:
+            continue
+
+
+async def _download_to(path: Path, response: aiohttp.ClientResponse) -> str:
+    """Stream a response body to disk through a single writer thread, returning its SHA-256"""
+    digest = hashlib.sha256()
+    chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    writer = asyncio.create_task(asyncio.to_thread(_writer_loop, path, chunks, digest))
+    put_nowait = chunks.put_nowait
+    try:
+        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+            try:
+                put_nowait(chunk)
+            except queue.Full:
+                await _put_chunk(chunks, chunk, writer)
+    finally:
+        if not writer.done():
+            await _put_chunk(chunks, None, writer)
+        await writer
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_version(value: str) -> Optional[Version]:
+    """Parse a release tag, or None if it is not a valid version"""
+    try:
+        return Version(value)
+    except InvalidVersion:
+        return None
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Hard-link src to dst, copying instead when linking is not possible"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        # e.g. EXDEV when the backup lives on another filesystem
+        shutil.copy2(src, dst)
+
+
+def _chown_tree(root: Path, user: str, group: str) -> None:
+    """Recursively chown root, resolving the user and group only once"""
+    uid = pwd.getpwnam(user).pw_uid
+    gid = grp.getgrnam(group).gr_gid
+    os.lchown(root, uid, gid)
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            os.lchown(os.path.join(dirpath, name), uid, gid)
+
+
+def _ignore_existing(src_root: Path, dest_root: Path):
+    """copytree ignore callback that skips files already present under dest_root"""
+    def ignore(directory, names):
+        dest = dest_root / os.path.relpath(directory, src_root)
+        return {
+            name for name in names
+            if os.path.lexists(dest / name)
+            and not (os.path.isdir(dest / name) and not os.path.islink(dest / name))
+        }
+    return ignore
+
+
+def _check_tarball(path: Path) -> bool:
+    """Cheap structural check: the archive opens and has a first member"""
+    try:
+        with tarfile.open(path, 'r:*') as tar:
+            return tar.next() is not None
+    except (tarfile.TarError, OSError):
+        return False
+
+
+def _strip_first_component(members):
+    """Drop the archive's top-level directory, like tar --strip-components=1"""
+    for member in members:
+        _, _, stripped = member.name.partition("/")
+        if not stripped:
+            continue
+        member.name = stripped
+        if member.islnk():
+            member.linkname = member.linkname.partition("/")[2]
+        yield member
+
+
+def _extract_tarball(path: Path, dest: Path) -> None:
+    """Extract a .tar.gz in-process, rejecting unsafe member paths where supported"""
+    with tarfile.open(path, "r:gz") as tar:
+        members = _strip_first_component(tar)
+        if hasattr(tarfile, "data_filter"):
+            # PEP 706 (3.12, backported to 3.8.17+/3.11.4+)
+            tar.extractall(dest, members=members, filter="data")
+        else:
+            tar.extractall(dest, members=members)
+
 
 class OTAUpdater:
     """Secure OTA update system for Raspberry Pi deployment"""
@@ -32,59 +197,156 @@ class OTAUpdater:
         self.backup_path = Path("/opt/heybuddy.backups")
         self.temp_path = Path("/tmp/heybuddy-update")
         self.lock_file = Path("/var/lock/heybuddy-update.lock")
+        # Kept under data/ so apply_update does not remove it
+        self.etag_file = self.install_path / "data" / ".update_etag"
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._systemd = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session (one connection pool for all update calls)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, ttl_dns_cache=300),
+                # No total timeout: release downloads can legitimately take minutes
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=60),
+                headers={"User-Agent": f"heybuddy/{self.current_version}"}
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _control_service(self, action: str):
+        """Start or stop the heyBuddy unit and wait for the job to finish"""
+        if SystemdManager is None:
+            subprocess.run(["systemctl", action, "heybuddy"], check=True)
+            return
+        
+        if self._systemd is None:
+            self._systemd = SystemdManager()
+            self._systemd.load()
+        unit_name = SERVICE_UNIT.encode()
+        if action == "start":
+            # StartUnit returns before the job runs, so a unit left failed by a
+            # crashed update would still read "failed" on the first poll below
+            self._systemd.Manager.ResetFailedUnit(unit_name)
+            self._systemd.Manager.StartUnit(unit_name, b"replace")
+            wanted = {b"active"}
+        else:
+            self._systemd.Manager.StopUnit(unit_name, b"replace")
+            wanted = {b"inactive", b"failed"}
         
+        # Like systemctl, block until the unit settles
+        unit = SystemdUnit(unit_name)
+        unit.load()
+        deadline = asyncio.get_running_loop().time() + UNIT_JOB_TIMEOUT
+        while (state := unit.Unit.ActiveState) not in wanted:
+            if state == b"failed" or asyncio.get_running_loop().time() > deadline:
+                raise RuntimeError(f"{SERVICE_UNIT} did not {action} (state: {state.decode()})")
+            await asyncio.sleep(0.1)
+    
+    def _load_etag(self) -> Optional[str]:
+        """ETag of the last release response that found no update"""
+        try:
+            return self.etag_file.read_text().strip() or None
+        except OSError:
+            return None
+    
+    def _store_etag(self, etag: Optional[str]):
+        """Persist (or clear) the release ETag for the next conditional request"""
+        try:
+            if etag:
+                self.etag_file.write_text(etag)
+            elif self.etag_file.exists():
+                self.etag_file.unlink()
+        except OSError as e:
+            logger.debug(f"Could not persist release ETag: {e}")
+    
     async def check_for_updates(self) -> Optional[Dict[str, Any]]:
         """Check GitHub for new releases"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.update_api_url}/latest") as response:
-                    if response.status == 200:
-                        release_data = await response.json()
-                        latest_version = release_data["tag_name"].lstrip("v")
-                        
-                        if self._is_newer_version(latest_version, self.current_version):
-                            logger.info(f"New version available: {latest_version} (current: {self.current_version})")
-                            return {
-                                "version": latest_version,
-                                "download_url": self._get_download_url(release_data),
-                                "release_notes": release_data.get("body", ""),
-                                "published_at": release_data["published_at"],
-                                "prerelease": release_data.get("prerelease", False)
-                            }
-                        else:
-                            logger.info(f"Already up to date: {self.current_version}")
-                            return None
+            headers = {"Accept": "application/vnd.github+json"}
+            etag = self._load_etag()
+            if etag:
+                headers["If-None-Match"] = etag
+            
+            session = self._get_session()
+            async with session.get(f"{self.update_api_url}/latest", headers=headers) as response:
+                if response.status == 304:
+                    # Release unchanged since the last check, which found no update
+                    logger.info(f"Already up to date: {self.current_version}")
+                    return None
+                elif response.status == 200:
+                    release_data = await response.json()
+                    latest_version = release_data["tag_name"].lstrip("v")
+                    
+                    if self._is_newer_version(latest_version, self.current_version):
+                        logger.info(f"New version available: {latest_version} (current: {self.current_version})")
+                        # Forget the ETag so a pending update is never hidden by a 304
+                        self._store_etag(None)
+                        assets = self._index_assets(release_data)
+                        return {
+                            "version": latest_version,
+                            "download_url": self._get_download_url(release_data, assets),
+                            "checksum_url": self._get_checksum_url(release_data, assets),
+                            "release_notes": release_data.get("body", ""),
+                            "published_at": release_data["published_at"],
+                            "prerelease": release_data.get("prerelease", False)
+                        }
                     else:
-                        logger.error(f"Failed to check for updates: {response.status}")
+                        logger.info(f"Already up to date: {self.current_version}")
+                        self._store_etag(response.headers.get("ETag"))
                         return None
+                else:
+                    logger.error(f"Failed to check for updates: {response.status}")
+                    return None
         except Exception as e:
             logger.error(f"Error checking for updates: {e}")
             return None
     
     def _is_newer_version(self, latest: str, current: str) -> bool:
-        """Compare version strings (semantic versioning)"""
-        def version_tuple(v):
-            return tuple(map(int, v.split('.')))
-        
-        try:
-            return version_tuple(latest) > version_tuple(current)
-        except ValueError:
+        """Compare version strings (PEP 440, so 1.2.0rc1 < 1.2.0)"""
+        latest_parsed, current_parsed = _parse_version(latest), _parse_version(current)
+        if latest_parsed is None or current_parsed is None:
             logger.warning(f"Invalid version format: latest={latest}, current={current}")
             return False
+        return latest_parsed > current_parsed
+    
+    def _index_assets(self, release_data: Dict) -> Dict[str, str]:
+        """Map the source tarball and its checksum to download URLs in one pass"""
+        index = {}
+        for asset in release_data.get("assets", []):
+            name = asset["name"].lower()
+            if "source" not in name:
+                continue
+            if name.endswith(".tar.gz"):
+                index.setdefault("tarball", asset["browser_download_url"])
+            elif name.endswith(".tar.gz.sha256"):
+                index.setdefault("checksum", asset["browser_download_url"])
+        return index
     
-    def _get_download_url(self, release_data: Dict) -> Optional[str]:
+    def _get_download_url(self, release_data: Dict, assets: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Extract download URL from GitHub release"""
-        assets = release_data.get("assets", [])
-        
-        # Look for source code tarball
-        for asset in assets:
-            if asset["name"].endswith(".tar.gz") and "source" in asset["name"].lower():
-                return asset["browser_download_url"]
-        
-        # Fallback to tarball_url
-        return release_data.get("tarball_url")
+        if assets is None:
+            assets = self._index_assets(release_data)
+        # Source code tarball, falling back to tarball_url
+        return assets.get("tarball") or release_data.get("tarball_url")
+    
+    def _get_checksum_url(self, release_data: Dict, assets: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Find the published .sha256 asset for the source tarball, if any"""
+        if assets is None:
+            assets = self._index_assets(release_data)
+        return assets.get("checksum")
     
-    async def download_update(self, download_url: str, expected_version: str) -> Optional[Path]:
+    async def download_update(
+        self,
+        download_url: str,
+        expected_version: str,
+        checksum_url: Optional[str] = None
+    ) -> Optional[Path]:
         """Download and verify update package"""
         if self.lock_file.exists():
             logger.error("Update already in progress")
@@ -100,24 +362,38 @@ class OTAUpdater:
             
             logger.info(f"Downloading update from {download_url}")
             
-            async with aiohttp.ClientSession() as session:
+            session = self._get_session()
+            # Fetch the small checksum file while the archive streams
+            checksum_task = (
+                asyncio.create_task(self._fetch_checksum(session, checksum_url))
+                if checksum_url else None
+            )
+            actual_digest = None
+            try:
                 async with session.get(download_url) as response:
-                    if response.status == 200:
-                        async with aiofiles.open(update_file, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                await f.write(chunk)
-                        
-                        logger.info(f"Downloaded update: {update_file}")
-                        
-                        # Verify download
-                        if await self._verify_update(update_file):
-                            return update_file
-                        else:
-                            logger.error("Update verification failed")
-                            return None
-                    else:
+                    if response.status != 200:
                         logger.error(f"Download failed: {response.status}")
                         return None
+                    actual_digest = await _download_to(update_file, response)
+            finally:
+                if checksum_task and actual_digest is None:
+                    checksum_task.cancel()
+            
+            logger.info(f"Downloaded update: {update_file}")
+            
+            expected_digest = None
+            if checksum_task:
+                expected_digest = await checksum_task
+                if expected_digest is None:
+                    logger.error("Could not fetch published checksum")
+                    return None
+            
+            # Verify download
+            if await self._verify_update(update_file, actual_digest, expected_digest):
+                return update_file
+            else:
+                logger.error("Update verification failed")
+                return None
                         
         except Exception as e:
             logger.error(f"Error downloading update: {e}")
@@ -127,22 +403,42 @@ class OTAUpdater:
             if self.lock_file.exists():
                 self.lock_file.unlink()
     
-    async def _verify_update(self, update_file: Path) -> bool:
+    async def _fetch_checksum(self, session: aiohttp.ClientSession, checksum_url: str) -> Optional[str]:
+        """Download a sha256sum-style file and return its hex digest"""
+        try:
+            async with session.get(checksum_url) as response:
+                if response.status != 200:
+                    logger.error(f"Checksum download failed: {response.status}")
+                    return None
+                body = await response.text()
+            parts = body.split()
+            return parts[0].lower() if parts else None
+        except Exception as e:
+            logger.error(f"Error fetching checksum: {e}")
+            return None
+    
+    async def _verify_update(
+        self,
+        update_file: Path,
+        actual_digest: str,
+        expected_digest: Optional[str] = None
+    ) -> bool:
         """Verify integrity of downloaded update"""
         try:
-            # Basic verification - check if it's a valid tar.gz
-            result = subprocess.run(
-                ["tar", "-tzf", str(update_file)],
-                capture_output=True,
-                text=True
-            )
+            if expected_digest is not None:
+                # Digest was computed while streaming, so this costs no extra pass
+                if actual_digest != expected_digest:
+                    logger.error(f"Update checksum mismatch: {actual_digest} != {expected_digest}")
+                    return False
+                logger.info("Update package checksum verified")
+                return True
             
-            if result.returncode == 0:
+            # No published checksum - only confirm the archive opens
+            if await asyncio.to_thread(_check_tarball, update_file):
                 logger.info("Update package verification passed")
                 return True
-            else:
-                logger.error(f"Update verification failed: {result.stderr}")
-                return False
+            logger.error("Update verification failed: not a readable tarball")
+            return False
                 
         except Exception as e:
             logger.error(f"Error verifying update: {e}")
@@ -151,19 +447,31 @@ class OTAUpdater:
     async def create_backup(self) -> Optional[Path]:
         """Create backup of current installation"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Local time like existing backups; microseconds avoid same-second collisions
+            now = datetime.now()
+            timestamp = now.strftime("%Y%m%d_%H%M%S_%f")
             backup_dir = self.backup_path / f"backup_{timestamp}"
             backup_dir.parent.mkdir(exist_ok=True)
             
             logger.info(f"Creating backup: {backup_dir}")
             
-            # Copy current installation
-            shutil.copytree(self.install_path, backup_dir, symlinks=True)
+            # Hard-link snapshot of the installation. apply_update unlinks old
+            # files before writing new ones, so linked inodes stay intact
+            backup_dir.mkdir()
+            for item in self.install_path.iterdir():
+                dest = backup_dir / item.name
+                copy_function = shutil.copy2 if item.name in COPY_ON_BACKUP else _link_or_copy
+                if item.is_dir() and not item.is_symlink():
+                    shutil.copytree(item, dest, symlinks=True, copy_function=copy_function)
+                elif item.is_symlink():
+                    os.symlink(os.readlink(item), dest)
+                else:
+                    copy_function(item, dest)
             
             # Create backup metadata
             metadata = {
                 "version": self.current_version,
-                "created_at": datetime.now().isoformat(),
+                "created_at": now.isoformat(),
                 "path": str(backup_dir)
             }
             
@@ -182,44 +490,57 @@ class OTAUpdater:
         """Apply update with rollback capability"""
         try:
             logger.info("Stopping heyBuddy service...")
-            subprocess.run(["systemctl", "stop", "heybuddy"], check=True)
+            await self._control_service("stop")
             
-            # Extract update to temporary location
-            extract_dir = self.temp_path / "extracted"
-            extract_dir.mkdir(exist_ok=True)
+            # Stage the new tree next to the install so the swap is a same-filesystem rename
+            staging_dir = self.install_path.with_name(self.install_path.name + ".new")
+            old_dir = self.install_path.with_name(self.install_path.name + ".old")
+            for leftover in (staging_dir, old_dir):
+                if leftover.exists():
+                    shutil.rmtree(leftover)
+            staging_dir.mkdir()
             
             logger.info(f"Extracting update: {update_file}")
-            result = subprocess.run([
-                "tar", "-xzf", str(update_file), "-C", str(extract_dir), "--strip-components=1"
-            ], capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.error(f"Failed to extract update: {result.stderr}")
+            try:
+                await asyncio.to_thread(_extract_tarball, update_file, staging_dir)
+            except (tarfile.TarError, OSError) as e:
+                logger.error(f"Failed to extract update: {e}")
+                shutil.rmtree(staging_dir, ignore_errors=True)
                 return False
             
             # Apply update
             logger.info("Applying update...")
             
-            # Remove old installation (except data directory)
-            for item in self.install_path.iterdir():
-                if item.name not in ["data", "logs", "config"]:
-                    if item.is_dir():
-                        shutil.rmtree(item)
-                    else:
-                        item.unlink()
-            
-            # Copy new files
-            for item in extract_dir.iterdir():
-                if item.name not in ["data", "logs"]:  # Preserve user data
-                    dest = self.install_path / item.name
-                    if item.is_dir():
-                        shutil.copytree(item, dest, dirs_exist_ok=True)
-                    else:
-                        shutil.copy2(item, dest)
-            
-            # Update permissions
-            shutil.chown(self.install_path, user="heybuddy", group="heybuddy")
-            subprocess.run(["chmod", "+x", str(self.install_path / "scripts" / "*.sh")], shell=True)
+            # Carry preserved directories over as hard links (the service is
+            # stopped, so nothing writes them until the swap has happened)
+            for name in PRESERVED_ON_UPDATE:
+                current = self.install_path / name
+                staged = staging_dir / name
+                if name in USER_DATA and staged.exists():
+                    # Never take user data from a release archive
+                    shutil.rmtree(staged)
+                if current.is_dir():
+                    # Release files win for config; local-only files are kept
+                    shutil.copytree(
+                        current, staged, symlinks=True, dirs_exist_ok=True,
+                        copy_function=_link_or_copy,
+                        ignore=_ignore_existing(current, staged)
+                    )
+            
+            # Update permissions before the tree goes live
+            _chown_tree(staging_dir, "heybuddy", "heybuddy")
+            exec_bits = stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+            for script in (staging_dir / "scripts").glob("*.sh"):
+                script.chmod(script.stat().st_mode | exec_bits)
+            
+            # Swap trees: the install is only ever fully old or fully new
+            os.rename(self.install_path, old_dir)
+            try:
+                os.rename(staging_dir, self.install_path)
+            except OSError:
+                os.rename(old_dir, self.install_path)
+                raise
+            shutil.rmtree(old_dir)
             
             logger.info("Update applied successfully")
             return True
@@ -232,29 +553,37 @@ class OTAUpdater:
         """Test if update was successful"""
         try:
             logger.info("Starting heyBuddy service...")
-            subprocess.run(["systemctl", "start", "heybuddy"], check=True)
-            
-            # Wait for service to start
-            await asyncio.sleep(10)
-            
-            # Test health endpoint
-            async with aiohttp.ClientSession() as session:
+            await self._control_service("start")
+            
+            # Poll the health endpoint with backoff until it reports healthy
+            session = self._get_session()
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + HEALTH_CHECK_DEADLINE
+            delay = HEALTH_POLL_INITIAL
+            last_problem = "service did not respond"
+            while True:
                 try:
-                    async with session.get("http://localhost:8080/health", timeout=30) as response:
+                    async with session.get(
+                        "http://localhost:8080/health",
+                        timeout=aiohttp.ClientTimeout(total=HEALTH_REQUEST_TIMEOUT)
+                    ) as response:
                         if response.status == 200:
                             health_data = await response.json()
                             if health_data.get("status") == "healthy":
                                 logger.info("Update test passed - service is healthy")
                                 return True
-                            else:
-                                logger.error(f"Health check failed: {health_data}")
-                                return False
+                            last_problem = f"unhealthy status: {health_data}"
                         else:
-                            logger.error(f"Health endpoint returned {response.status}")
-                            return False
-                except asyncio.TimeoutError:
-                    logger.error("Health check timed out")
+                            last_problem = f"health endpoint returned {response.status}"
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    # Not listening yet
+                    pass
+                
+                if loop.time() + delay > deadline:
+                    logger.error(f"Health check failed: {last_problem}")
                     return False
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, HEALTH_POLL_MAX)
                     
         except Exception as e:
             logger.error(f"Error testing update: {e}")
@@ -266,7 +595,7 @@ class OTAUpdater:
             logger.info(f"Rolling back to backup: {backup_dir}")
             
             # Stop service
-            subprocess.run(["systemctl", "stop", "heybuddy"], check=True)
+            await self._control_service("stop")
             
             # Remove current installation
             shutil.rmtree(self.install_path)
@@ -275,10 +604,10 @@ class OTAUpdater:
             shutil.copytree(backup_dir, self.install_path, symlinks=True)
             
             # Restore permissions
-            shutil.chown(self.install_path, user="heybuddy", group="heybuddy")
+            _chown_tree(self.install_path, "heybuddy", "heybuddy")
             
             # Restart service
-            subprocess.run(["systemctl", "start", "heybuddy"], check=True)
+            await self._control_service("start")
             
             logger.info("Rollback completed successfully")
             return True
@@ -293,14 +622,17 @@ class OTAUpdater:
             if not self.backup_path.exists():
                 return
             
-            backups = sorted(
-                [d for d in self.backup_path.iterdir() if d.is_dir()],
-                key=lambda x: x.stat().st_mtime,
-                reverse=True
-            )
+            # Newest first by modification time: local-time names repeat an hour
+            # when DST ends, so the name alone does not order them reliably
+            with os.scandir(self.backup_path) as entries:
+                backups = sorted(
+                    ((e.stat(follow_symlinks=False).st_mtime, e.path) for e in entries
+                     if e.name.startswith("backup_") and e.is_dir(follow_symlinks=False)),
+                    reverse=True
+                )
             
             # Remove old backups
-            for backup in backups[keep_count:]:
+            for _mtime, backup in backups[keep_count:]:
                 logger.info(f"Removing old backup: {backup}")
                 shutil.rmtree(backup)
                 
@@ -328,7 +660,9 @@ class OTAUpdater:
             logger.info(f"Starting update to version {new_version}")
             
             # Download update
-            update_file = await self.download_update(update_info["download_url"], new_version)
+            update_file = await self.download_update(
+                update_info["download_url"], new_version, update_info.get("checksum_url")
+            )
             if not update_file:
                 result["error"] = "Failed to download update"
                 return result
@@ -382,28 +716,30 @@ async def main():
     args = parser.parse_args()
     
     updater = OTAUpdater()
-    
-    if args.check:
-        update_info = await updater.check_for_updates()
-        if update_info:
-            print(f"Update available: {update_info['version']}")
-            print(f"Release notes: {update_info['release_notes'][:200]}...")
-        else:
-            print("No updates available")
-    
-    elif args.update:
-        result = await updater.perform_update()
-        print(json.dumps(result, indent=2))
-    
-    elif args.simulate:
-        print("Simulating update process...")
-        # Simulate update without actually applying it
-        update_info = await updater.check_for_updates()
-        if update_info:
-            print(f"Would update to: {update_info['version']}")
-        backup_dir = await updater.create_backup()
-        if backup_dir:
-            print(f"Backup created: {backup_dir}")
+    try:
+        if args.check:
+            update_info = await updater.check_for_updates()
+            if update_info:
+                print(f"Update available: {update_info['version']}")
+                print(f"Release notes: {update_info['release_notes'][:200]}...")
+            else:
+                print("No updates available")
+        
+        elif args.update:
+            result = await updater.perform_update()
+            print(json.dumps(result, indent=2))
+        
+        elif args.simulate:
+            print("Simulating update process...")
+            # Simulate update without actually applying it
+            update_info = await updater.check_for_updates()
+            if update_info:
+                print(f"Would update to: {update_info['version']}")
+            backup_dir = await updater.create_backup()
+            if backup_dir:
+                print(f"Backup created: {backup_dir}")
+    finally:
+        await updater.close()
 
 
 if __name__ == "__main__":
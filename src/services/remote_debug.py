@@ -3,28 +3,122 @@ Remote Debugging System for heyBuddy Raspberry Pi Devices
 Provides secure remote access for development and troubleshooting
 """
 import asyncio
+import heapq
 import logging
 import json
 import psutil
 import os
 import socket
+import time
+import weakref
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
-import subprocess
 import aiofiles
+import aiohttp
 from fastapi import WebSocket
 from core.config import settings
 
+try:
+    from pystemd.systemd1 import Unit as SystemdUnit  # optional D-Bus client
+except ImportError:
+    SystemdUnit = None
+
+try:
+    import orjson  # optional: faster JSON encode
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _dumps = json.dumps
+
 logger = logging.getLogger(__name__)
 
 
+async def send_message(websocket: WebSocket, message: Dict[str, Any]) -> None:
+    """Send a JSON message, encoded with orjson when available
+    
+    Sent as a text frame so browsers can keep using JSON.parse(event.data).
+    """
+    await websocket.send_text(_dumps(message))
+
+# Prime psutil's CPU counters so later non-blocking cpu_percent() calls
+# measure the time since the previous snapshot
+psutil.cpu_percent(interval=None)
+
+
+async def _run(*args: str) -> Tuple[int, str, str]:
+    """Run a command without blocking the event loop; returns (returncode, stdout, stderr)"""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+_MEMINFO_KEYS = frozenset((b"MemTotal", b"MemAvailable", b"SwapTotal", b"SwapFree"))
+
+
 class SystemMonitor:
     """Monitor system health and performance metrics"""
     
+    SNAPSHOT_TTL_SECONDS = 1.0
+    
+    # (monotonic time, snapshot) shared by all sessions and commands
+    _snapshot_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+    # Created on first use, one per event loop (tests, asyncio.Runner)
+    _snapshot_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+        weakref.WeakKeyDictionary()
+    )
+    
+    TOP_PROCESS_COUNT = 10
+    
+    # pid -> (Process handle, CPU seconds at the previous sweep)
+    _proc_cache: Dict[int, Tuple[psutil.Process, float]] = {}
+    _last_system_cpu_time: float = 0.0
+    
+    DISK_TTL_SECONDS = 5.0
+    
+    # (monotonic time, disk section); disk figures change slowly
+    _disk_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+    
     @staticmethod
     async def get_system_info() -> Dict[str, Any]:
-        """Get comprehensive system information"""
+        """Get comprehensive system information (cached for SNAPSHOT_TTL_SECONDS)"""
+        cached = SystemMonitor._fresh_snapshot()
+        if cached is None:
+            async with SystemMonitor._snapshot_lock():
+                # Another caller may have refreshed it while we waited
+                cached = SystemMonitor._fresh_snapshot()
+                if cached is None:
+                    result = await SystemMonitor._collect_system_info()
+                    if "error" in result:
+                        return result
+                    SystemMonitor._snapshot_cache = (time.monotonic(), result)
+                    return dict(result)
+        return dict(cached, timestamp=datetime.now().isoformat())
+    
+    @staticmethod
+    def _snapshot_lock() -> asyncio.Lock:
+        """Return the snapshot lock for the running event loop"""
+        loop = asyncio.get_running_loop()
+        lock = SystemMonitor._snapshot_locks.get(loop)
+        if lock is None:
+            lock = SystemMonitor._snapshot_locks[loop] = asyncio.Lock()
+        return lock
+    
+    @staticmethod
+    def _fresh_snapshot() -> Optional[Dict[str, Any]]:
+        cache = SystemMonitor._snapshot_cache
+        if cache and time.monotonic() - cache[0] < SystemMonitor.SNAPSHOT_TTL_SECONDS:
+            return cache[1]
+        return None
+    
+    @staticmethod
+    async def _collect_system_info() -> Dict[str, Any]:
+        """Read a fresh snapshot from psutil and /sys"""
         try:
             result = {
                 "timestamp": datetime.now().isoformat(),
@@ -38,7 +132,8 @@ class SystemMonitor:
             
             # CPU Information
             try:
-                cpu_percent = psutil.cpu_percent(interval=0.1)  # Shorter interval
+                # Non-blocking: usage since the previous snapshot (at least the TTL ago)
+                cpu_percent = psutil.cpu_percent(interval=None)
                 cpu_count = psutil.cpu_count()
                 cpu_freq = psutil.cpu_freq()
                 
@@ -46,7 +141,7 @@ class SystemMonitor:
                     "usage_percent": round(cpu_percent, 1),
                     "count": cpu_count,
                     "frequency_mhz": round(cpu_freq.current, 1) if cpu_freq and cpu_freq.current else None,
-                    "temperature_celsius": await SystemMonitor._get_pi_temperature()
+                    "temperature_celsius": SystemMonitor._get_pi_temperature()
                 }
             except Exception as e:
                 logger.warning(f"Error getting CPU info: {e}")
@@ -54,28 +149,14 @@ class SystemMonitor:
             
             # Memory Information
             try:
-                memory = psutil.virtual_memory()
-                swap = psutil.swap_memory()
-                
-                result["memory"] = {
-                    "total_gb": round(memory.total / (1024**3), 2),
-                    "available_gb": round(memory.available / (1024**3), 2),
-                    "used_percent": round(memory.percent, 1),
-                    "swap_used_percent": round(swap.percent, 1)
-                }
+                result["memory"] = SystemMonitor._get_memory_info()
             except Exception as e:
                 logger.warning(f"Error getting memory info: {e}")
                 result["memory"] = {"error": str(e)}
             
             # Disk Information
             try:
-                disk = psutil.disk_usage('/')
-                
-                result["disk"] = {
-                    "total_gb": round(disk.total / (1024**3), 2),
-                    "free_gb": round(disk.free / (1024**3), 2),
-                    "used_percent": round((disk.used / disk.total) * 100, 1)
-                }
+                result["disk"] = SystemMonitor._get_disk_info()
             except Exception as e:
                 logger.warning(f"Error getting disk info: {e}")
                 result["disk"] = {"error": str(e)}
@@ -94,6 +175,12 @@ class SystemMonitor:
                 logger.warning(f"Error getting network info: {e}")
                 result["network"] = {"error": str(e)}
             
+            # Top processes
+            try:
+                result["top_processes"] = SystemMonitor._get_top_processes()
+            except Exception as e:
+                logger.warning(f"Error getting process info: {e}")
+            
             # Uptime
             try:
                 boot_time = psutil.boot_time()
@@ -110,93 +197,196 @@ class SystemMonitor:
             return {"error": str(e), "timestamp": datetime.now().isoformat()}
     
     @staticmethod
-    async def _get_pi_temperature() -> Optional[float]:
+    def _get_memory_info() -> Dict[str, Any]:
+        """Memory and swap usage from a single /proc/meminfo read"""
+        try:
+            with open("/proc/meminfo", "rb") as f:
+                data = f.read()
+        except OSError:
+            # Not Linux: psutil's per-platform implementation
+            memory = psutil.virtual_memory()
+            swap = psutil.swap_memory()
+            total, available = memory.total, memory.available
+            swap_percent = swap.percent
+        else:
+            meminfo = {}
+            for line in data.splitlines():
+                key, _, value = line.partition(b":")
+                if key in _MEMINFO_KEYS:
+                    meminfo[key] = int(value.split()[0]) * 1024
+            total = meminfo[b"MemTotal"]
+            available = meminfo[b"MemAvailable"]
+            swap_total = meminfo.get(b"SwapTotal", 0)
+            swap_percent = (swap_total - meminfo.get(b"SwapFree", 0)) / swap_total * 100 if swap_total else 0.0
+        
+        return {
+            "total_gb": round(total / (1024**3), 2),
+            "available_gb": round(available / (1024**3), 2),
+            "used_percent": round((total - available) / total * 100, 1),
+            "swap_used_percent": round(swap_percent, 1)
+        }
+    
+    @staticmethod
+    def _get_disk_info() -> Dict[str, Any]:
+        """Root filesystem usage from statvfs, cached for DISK_TTL_SECONDS"""
+        now = time.monotonic()
+        cache = SystemMonitor._disk_cache
+        if cache is not None and now - cache[0] < SystemMonitor.DISK_TTL_SECONDS:
+            return cache[1]
+        
+        st = os.statvfs('/')
+        total = st.f_blocks * st.f_frsize
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        disk = {
+            "total_gb": round(total / (1024**3), 2),
+            "free_gb": round(st.f_bavail * st.f_frsize / (1024**3), 2),
+            "used_percent": round((used / total) * 100, 1)
+        }
+        SystemMonitor._disk_cache = (now, disk)
+        return disk
+    
+    @staticmethod
+    def _get_top_processes() -> List[Dict[str, Any]]:
+        """Busiest processes since the previous sweep, as a share of total CPU time
+        
+        Reads /proc/stat once per sweep and each process's stat once, keeping
+        Process handles between sweeps instead of calling cpu_percent() per process.
+        """
+        system_cpu_time = sum(psutil.cpu_times())
+        system_delta = system_cpu_time - SystemMonitor._last_system_cpu_time
+        SystemMonitor._last_system_cpu_time = system_cpu_time
+        
+        previous = SystemMonitor._proc_cache
+        current: Dict[int, Tuple[psutil.Process, float]] = {}
+        usage = []
+        for pid in psutil.pids():
+            cached = previous.get(pid)
+            try:
+                proc = cached[0] if cached else psutil.Process(pid)
+                times = proc.cpu_times()
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            cpu_time = times.user + times.system
+            current[pid] = (proc, cpu_time)
+            # New processes have no baseline yet and count from the next sweep
+            if cached and system_delta > 0:
+                usage.append((cpu_time - cached[1], proc))
+        # Dead pids drop out because only live ones are carried over
+        SystemMonitor._proc_cache = current
+        
+        top = []
+        for delta, proc in heapq.nlargest(SystemMonitor.TOP_PROCESS_COUNT, usage, key=lambda item: item[0]):
+            try:
+                top.append({
+                    "pid": proc.pid,
+                    "name": proc.name(),
+                    "cpu_percent": round(delta / system_delta * 100, 1),
+                    "memory_mb": round(proc.memory_info().rss / (1024**2), 1)
+                })
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        return top
+    
+    @staticmethod
+    def _get_pi_temperature() -> Optional[float]:
         """Get Raspberry Pi CPU temperature"""
+        # sysfs reads never block, so a thread hop would cost more than the read
         try:
-            if Path("/sys/class/thermal/thermal_zone0/temp").exists():
-                async with aiofiles.open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
-                    temp_str = await f.read()
-                    return round(float(temp_str.strip()) / 1000, 1)
-        except Exception:
-            pass
-        return None
+            with open("/sys/class/thermal/thermal_zone0/temp", "rb") as f:
+                return round(int(f.read()) / 1000, 1)  # millidegrees, e.g. b"48312\n"
+        except (OSError, ValueError):
+            return None
 
 
 class LogStreamer:
     """Stream application logs in real-time"""
     
+    FOLLOW_POLL_SECONDS = 0.25
+    # Upper bound on one follow read, so a large burst is sent in pieces
+    FOLLOW_READ_SIZE = 1 << 16
+    # Lines per log_batch frame
+    MAX_BATCH_LINES = 500
+    # Initial guess at bytes per line when seeking back for the backlog
+    AVG_LINE_BYTES = 200
+    
     def __init__(self):
         self.log_file = "/opt/heybuddy/logs/app.log"
-        self.active_streams: Dict[str, WebSocket] = {}
     
-    async def add_stream(self, stream_id: str, websocket: WebSocket):
-        """Add a new log stream"""
-        self.active_streams[stream_id] = websocket
-        logger.info(f"Added log stream: {stream_id}")
+    async def _send_batch(self, websocket: WebSocket, lines: List[str], source: str):
+        """Send lines as log_batch frames of at most MAX_BATCH_LINES each"""
+        for start in range(0, len(lines), self.MAX_BATCH_LINES):
+            await send_message(websocket, {
+                "type": "log_batch",
+                "data": {
+                    "lines": lines[start:start + self.MAX_BATCH_LINES],
+                    "timestamp": datetime.now().isoformat(),
+                    "source": source
+                }
+            })
     
-    async def remove_stream(self, stream_id: str):
-        """Remove a log stream"""
-        if stream_id in self.active_streams:
-            del self.active_streams[stream_id]
-            logger.info(f"Removed log stream: {stream_id}")
+    async def _read_last_lines(self, f, lines: int) -> List[str]:
+        """Return the last non-empty lines of an open binary file, without reading all of it"""
+        size = await f.seek(0, os.SEEK_END)
+        window = lines * self.AVG_LINE_BYTES
+        while True:
+            start = max(0, size - window)
+            await f.seek(start)
+            data = await f.read(size - start)
+            found = [line for line in data.splitlines() if line.strip()]
+            # The first line may be cut off unless we started at the beginning
+            if start > 0:
+                found = found[1:]
+            if len(found) >= lines or start == 0:
+                return [line.decode(errors="replace").strip() for line in found[-lines:]]
+            window *= 2
     
     async def stream_logs(self, websocket: WebSocket, lines: int = 100):
         """Stream recent logs and follow new ones"""
         try:
-            # Send recent logs first
-            if Path(self.log_file).exists():
-                result = subprocess.run(
-                    ["tail", "-n", str(lines), self.log_file],
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode == 0:
-                    for line in result.stdout.strip().split('\n'):
-                        if line.strip():
-                            await websocket.send_json({
-                                "type": "log_line",
-                                "data": {
-                                    "line": line,
-                                    "timestamp": datetime.now().isoformat(),
-                                    "source": "historical"
-                                }
-                            })
-            
-            # Follow new logs
-            process = None
+            f = await aiofiles.open(self.log_file, "rb")
             try:
-                process = await asyncio.create_subprocess_exec(
-                    "tail", "-f", self.log_file,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
+                # Send recent logs first
+                await self._send_batch(websocket, await self._read_last_lines(f, lines), "historical")
                 
+                # Follow new logs from the current end of file
+                position = await f.seek(0, os.SEEK_END)
+                partial = b""
                 while True:
-                    line = await process.stdout.readline()
-                    if not line:
-                        break
+                    chunk = await f.read(self.FOLLOW_READ_SIZE)
+                    if not chunk:
+                        try:
+                            current = os.stat(self.log_file)
+                        except FileNotFoundError:
+                            current = None  # renamed away, new file not created yet
+                        opened = os.fstat(f.fileno())
+                        if current is not None and (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev):
+                            # Rotated by rename (logrotate "create"): the old file is
+                            # fully read, so follow the new one from its start
+                            if partial.strip():
+                                await self._send_batch(websocket, [partial.decode(errors="replace").strip()], "live")
+                            await f.close()
+                            f = await aiofiles.open(self.log_file, "rb")
+                            position = 0
+                            partial = b""
+                            continue
+                        if current is not None and current.st_size < position:
+                            # Same file got smaller (copytruncate rotation): start over
+                            position = await f.seek(0)
+                            partial = b""
+                        await asyncio.sleep(self.FOLLOW_POLL_SECONDS)
+                        continue
                     
-                    log_line = line.decode().strip()
-                    if log_line:
-                        await websocket.send_json({
-                            "type": "log_line",
-                            "data": {
-                                "line": log_line,
-                                "timestamp": datetime.now().isoformat(),
-                                "source": "live"
-                            }
-                        })
-                        
-            except asyncio.CancelledError:
-                if process:
-                    process.terminate()
-                    await process.wait()
-                raise
-                
+                    position += len(chunk)
+                    # Everything written since the last poll goes out together
+                    *complete, partial = (partial + chunk).split(b"\n")
+                    new_lines = [raw.decode(errors="replace").strip() for raw in complete]
+                    await self._send_batch(websocket, [line for line in new_lines if line], "live")
+            finally:
+                await f.close()
+            
         except Exception as e:
             logger.error(f"Error streaming logs: {e}")
-            await websocket.send_json({
+            await send_message(websocket, {
                 "type": "error",
                 "data": {"message": f"Log streaming error: {str(e)}"}
             })
@@ -209,54 +399,102 @@ class ServiceController:
     async def get_service_status() -> Dict[str, Any]:
         """Get status of heyBuddy services"""
         try:
-            services = {
-                "heybuddy": await ServiceController._get_systemd_status("heybuddy"),
-                "heybuddy-updater": await ServiceController._get_systemd_status("heybuddy-updater"),
+            heybuddy, updater, application_health = await asyncio.gather(
+                ServiceController._get_systemd_status("heybuddy"),
+                ServiceController._get_systemd_status("heybuddy-updater"),
+                ServiceController._probe_health()
+            )
+            return {
+                "heybuddy": heybuddy,
+                "heybuddy-updater": updater,
+                "application_health": application_health
             }
             
-            # Check if main application is responding
-            try:
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
-                    async with session.get("http://localhost:8080/health", timeout=5) as response:
-                        if response.status == 200:
-                            health_data = await response.json()
-                            services["application_health"] = health_data
-                        else:
-                            services["application_health"] = {"status": "unhealthy", "http_status": response.status}
-            except Exception as e:
-                services["application_health"] = {"status": "unreachable", "error": str(e)}
-            
-            return services
-            
         except Exception as e:
             logger.error(f"Error getting service status: {e}")
             return {"error": str(e)}
     
+    # Keep-alive session for the loopback /health probe, created on first use
+    _session: Optional[aiohttp.ClientSession] = None
+    
+    @classmethod
+    def _get_session(cls) -> aiohttp.ClientSession:
+        # Creation never awaits, so concurrent probes cannot build two sessions
+        if cls._session is None or cls._session.closed:
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=5)
+            )
+        return cls._session
+    
+    @classmethod
+    async def close(cls):
+        """Close the shared HTTP session"""
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+        cls._session = None
+    
+    @staticmethod
+    async def _probe_health() -> Dict[str, Any]:
+        """Check if main application is responding"""
+        try:
+            session = ServiceController._get_session()
+            async with session.get(f"http://localhost:{settings.api_port}/health") as response:
+                if response.status == 200:
+                    return await response.json()
+                return {"status": "unhealthy", "http_status": response.status}
+        except Exception as e:
+            return {"status": "unreachable", "error": str(e)}
+    
+    # Loaded pystemd units by service name; properties are read live on access
+    _units: Dict[str, Any] = {}
+    
+    @staticmethod
+    def _read_unit_props(service_name: str) -> Dict[str, Any]:
+        """Read unit properties over D-Bus (blocking; run in a worker thread)"""
+        unit = ServiceController._units.get(service_name)
+        if unit is None:
+            unit = SystemdUnit(f"{service_name}.service".encode())
+            unit.load()
+            ServiceController._units[service_name] = unit
+        return {
+            "ActiveState": unit.Unit.ActiveState.decode(),
+            "SubState": unit.Unit.SubState.decode(),
+            "LoadState": unit.Unit.LoadState.decode(),
+            "ExecMainStatus": unit.Service.ExecMainStatus
+        }
+    
     @staticmethod
     async def _get_systemd_status(service_name: str) -> Dict[str, Any]:
         """Get systemd service status"""
         try:
-            result = subprocess.run(
-                ["systemctl", "is-active", service_name],
-                capture_output=True,
-                text=True
-            )
-            
-            status = result.stdout.strip()
+            if SystemdUnit is not None:
+                props = await asyncio.to_thread(ServiceController._read_unit_props, service_name)
+            else:
+                # One fork for all properties instead of is-active + status
+                _, stdout, _ = await _run(
+                    "systemctl", "show", f"{service_name}.service",
+                    "--property=ActiveState,SubState,LoadState,ExecMainStatus"
+                )
+                props = dict(
+                    line.split("=", 1) for line in stdout.splitlines() if "=" in line
+                )
             
-            # Get more detailed info
-            result_detail = subprocess.run(
-                ["systemctl", "status", service_name, "--no-pager", "-l"],
-                capture_output=True,
-                text=True
-            )
+            # pystemd yields an int, systemctl a string; report an int either way
+            exec_main_status = props.get("ExecMainStatus")
+            try:
+                exec_main_status = int(exec_main_status)
+            except (TypeError, ValueError):
+                exec_main_status = None
             
+            status = props.get("ActiveState", "unknown")
             return {
                 "name": service_name,
                 "status": status,
                 "active": status == "active",
-                "details": result_detail.stdout if result_detail.returncode == 0 else None
+                "sub_state": props.get("SubState"),
+                "load_state": props.get("LoadState"),
+                "exec_main_status": exec_main_status
             }
             
         except Exception as e:
@@ -267,6 +505,14 @@ class ServiceController:
                 "error": str(e)
             }
     
+    @staticmethod
+    async def get_service_details(service_name: str) -> Dict[str, Any]:
+        """Full `systemctl status` output, fetched only on request"""
+        if service_name not in ["heybuddy", "heybuddy-updater"]:
+            return {"success": False, "error": "Invalid service name"}
+        _, stdout, _ = await _run("systemctl", "status", service_name, "--no-pager", "-l")
+        return {"success": True, "name": service_name, "details": stdout}
+    
     @staticmethod
     async def restart_service(service_name: str) -> Dict[str, Any]:
         """Restart a heyBuddy service"""
@@ -274,18 +520,14 @@ class ServiceController:
             if service_name not in ["heybuddy", "heybuddy-updater"]:
                 return {"success": False, "error": "Invalid service name"}
             
-            result = subprocess.run(
-                ["sudo", "systemctl", "restart", service_name],
-                capture_output=True,
-                text=True
-            )
+            returncode, _, stderr = await _run("sudo", "systemctl", "restart", service_name)
             
-            if result.returncode == 0:
+            if returncode == 0:
                 logger.info(f"Successfully restarted service: {service_name}")
                 return {"success": True, "message": f"Service {service_name} restarted"}
             else:
-                logger.error(f"Failed to restart service {service_name}: {result.stderr}")
-                return {"success": False, "error": result.stderr}
+                logger.error(f"Failed to restart service {service_name}: {stderr}")
+                return {"success": False, "error": stderr}
                 
         except Exception as e:
             logger.error(f"Error restarting service {service_name}: {e}")
@@ -295,39 +537,61 @@ class ServiceController:
 class NetworkDiagnostics:
     """Network connectivity and diagnostics"""
     
+    INTERFACES_TTL_SECONDS = 5.0
+    
+    # (monotonic time, interfaces, hostname); addresses rarely change between polls
+    _interfaces_cache: Optional[Tuple[float, Dict[str, Any], str]] = None
+    
     @staticmethod
-    async def get_network_info() -> Dict[str, Any]:
-        """Get network connectivity information"""
-        try:
-            # Get network interfaces
-            interfaces = {}
-            for interface, addrs in psutil.net_if_addrs().items():
-                interface_info = {
-                    "addresses": [],
-                    "stats": psutil.net_if_stats().get(interface, {})._asdict() if interface in psutil.net_if_stats() else {}
-                }
-                
-                for addr in addrs:
-                    interface_info["addresses"].append({
+    def _get_interfaces() -> Tuple[Dict[str, Any], str]:
+        """Interface addresses/stats and hostname, cached for INTERFACES_TTL_SECONDS"""
+        cache = NetworkDiagnostics._interfaces_cache
+        if cache and time.monotonic() - cache[0] < NetworkDiagnostics.INTERFACES_TTL_SECONDS:
+            return cache[1], cache[2]
+        
+        stats_map = psutil.net_if_stats()
+        interfaces = {}
+        for interface, addrs in psutil.net_if_addrs().items():
+            stats = stats_map.get(interface)
+            interfaces[interface] = {
+                "addresses": [
+                    {
                         "family": str(addr.family),
                         "address": addr.address,
                         "netmask": addr.netmask,
                         "broadcast": addr.broadcast
-                    })
-                
-                interfaces[interface] = interface_info
+                    }
+                    for addr in addrs
+                ],
+                "stats": stats._asdict() if stats else {}
+            }
+        hostname = socket.gethostname()
+        NetworkDiagnostics._interfaces_cache = (time.monotonic(), interfaces, hostname)
+        return interfaces, hostname
+    
+    @staticmethod
+    async def get_network_info() -> Dict[str, Any]:
+        """Get network connectivity information"""
+        try:
+            # Get network interfaces
+            interfaces, hostname = NetworkDiagnostics._get_interfaces()
             
             # Test connectivity
+            internet, openai_api, github = await asyncio.gather(
+                NetworkDiagnostics._test_connectivity("8.8.8.8", 53),
+                NetworkDiagnostics._test_connectivity("api.openai.com", 443),
+                NetworkDiagnostics._test_connectivity("api.github.com", 443)
+            )
             connectivity = {
-                "internet": await NetworkDiagnostics._test_connectivity("8.8.8.8", 53),
-                "openai_api": await NetworkDiagnostics._test_connectivity("api.openai.com", 443),
-                "github": await NetworkDiagnostics._test_connectivity("api.github.com", 443)
+                "internet": internet,
+                "openai_api": openai_api,
+                "github": github
             }
             
             return {
                 "interfaces": interfaces,
                 "connectivity": connectivity,
-                "hostname": socket.gethostname(),
+                "hostname": hostname,
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -335,24 +599,20 @@ class NetworkDiagnostics:
             logger.error(f"Error getting network info: {e}")
             return {"error": str(e)}
     
+    @staticmethod
+    def _blocking_probe(host: str, port: int, timeout: float) -> float:
+        """Open and close a TCP connection, returning the elapsed milliseconds"""
+        start = time.perf_counter()
+        # create_connection resolves the host and tries each address (IPv4/IPv6)
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+        return (time.perf_counter() - start) * 1000
+    
     @staticmethod
     async def _test_connectivity(host: str, port: int, timeout: int = 5) -> Dict[str, Any]:
         """Test connectivity to a specific host and port"""
         try:
-            start_time = datetime.now()
-            
-            # Create connection
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(host, port),
-                timeout=timeout
-            )
-            
-            # Close connection
-            writer.close()
-            await writer.wait_closed()
-            
-            end_time = datetime.now()
-            latency = (end_time - start_time).total_seconds() * 1000
+            latency = await asyncio.to_thread(NetworkDiagnostics._blocking_probe, host, port, timeout)
             
             return {
                 "host": host,
@@ -373,12 +633,19 @@ class NetworkDiagnostics:
 class RemoteDebugger:
     """Main remote debugging coordinator"""
     
+    # Per-session token bucket for the read-only probe commands
+    RATE_LIMITED_COMMANDS = frozenset(("get_system_info", "get_service_status", "get_network_info"))
+    COMMAND_RATE = 5.0  # tokens refilled per second
+    COMMAND_BURST = 5
+    
     def __init__(self):
         self.system_monitor = SystemMonitor()
         self.log_streamer = LogStreamer()
         self.service_controller = ServiceController()
         self.network_diagnostics = NetworkDiagnostics()
         self.active_sessions: Dict[str, Dict[str, Any]] = {}
+        self._rate: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._last_results: Dict[Tuple[str, str], Dict[str, Any]] = {}
     
     async def start_debug_session(self, session_id: str, websocket: WebSocket) -> Dict[str, Any]:
         """Start a new remote debugging session"""
@@ -398,12 +665,14 @@ class RemoteDebugger:
             
             self.active_sessions[session_id] = session_info
             
-            # Send initial system snapshot
-            system_info = await self.system_monitor.get_system_info()
-            service_status = await self.service_controller.get_service_status()
-            network_info = await self.network_diagnostics.get_network_info()
+            # Send initial system snapshot (probes run concurrently)
+            system_info, service_status, network_info = await asyncio.gather(
+                self.system_monitor.get_system_info(),
+                self.service_controller.get_service_status(),
+                self.network_diagnostics.get_network_info()
+            )
             
-            await websocket.send_json({
+            await send_message(websocket, {
                 "type": "session_started",
                 "data": {
                     "session_id": session_id,
@@ -424,7 +693,9 @@ class RemoteDebugger:
         """End a remote debugging session"""
         if session_id in self.active_sessions:
             del self.active_sessions[session_id]
-            await self.log_streamer.remove_stream(session_id)
+            for key in [key for key in self._rate if key[0] == session_id]:
+                del self._rate[key]
+                self._last_results.pop(key, None)
             logger.info(f"Remote debugging session ended: {session_id}")
     
     async def handle_debug_command(self, session_id: str, command: str, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -433,12 +704,19 @@ class RemoteDebugger:
             if session_id not in self.active_sessions:
                 return {"success": False, "error": "Invalid session"}
             
+            if command in self.RATE_LIMITED_COMMANDS:
+                key = (session_id, command)
+                if not self._take_token(key) and key in self._last_results:
+                    return {"success": True, "data": self._last_results[key], "cached": True}
+            
             if command == "get_system_info":
                 data = await self.system_monitor.get_system_info()
+                self._last_results[key] = data
                 return {"success": True, "data": data}
                 
             elif command == "get_service_status":
                 data = await self.service_controller.get_service_status()
+                self._last_results[key] = data
                 return {"success": True, "data": data}
                 
             elif command == "restart_service":
@@ -448,13 +726,19 @@ class RemoteDebugger:
                 data = await self.service_controller.restart_service(service_name)
                 return data
                 
+            elif command == "get_service_details":
+                service_name = params.get("service_name")
+                if not service_name:
+                    return {"success": False, "error": "service_name required"}
+                return await self.service_controller.get_service_details(service_name)
+                
             elif command == "get_network_info":
                 data = await self.network_diagnostics.get_network_info()
+                self._last_results[key] = data
                 return {"success": True, "data": data}
                 
             elif command == "stream_logs":
                 websocket = self.active_sessions[session_id]["websocket"]
-                await self.log_streamer.add_stream(session_id, websocket)
                 await self.log_streamer.stream_logs(websocket, params.get("lines", 100))
                 return {"success": True, "message": "Log streaming started"}
                 
@@ -465,20 +749,42 @@ class RemoteDebugger:
             logger.error(f"Error handling debug command {command}: {e}")
             return {"success": False, "error": str(e)}
     
+    def _take_token(self, key: Tuple[str, str]) -> bool:
+        """Refill and take one token from the bucket for key; False when it is empty"""
+        now = time.monotonic()
+        last, tokens = self._rate.get(key, (now, self.COMMAND_BURST))
+        tokens = min(self.COMMAND_BURST, tokens + (now - last) * self.COMMAND_RATE)
+        if tokens < 1:
+            self._rate[key] = (now, tokens)
+            return False
+        self._rate[key] = (now, tokens - 1)
+        return True
+    
+    async def close(self):
+        """Release shared network resources"""
+        await self.service_controller.close()
+    
+    async def persist_snapshot(self, path: Path) -> Path:
+        """Write a debug snapshot to path as JSON (one write, off the event loop)"""
+        snapshot = await self.get_debug_snapshot()
+        path = Path(path)
+        await asyncio.to_thread(_write_atomic, path, _dumps(snapshot).encode())
+        return path
+    
     async def get_debug_snapshot(self) -> Dict[str, Any]:
         """Get a complete system debug snapshot"""
         try:
+            system, services, network = await asyncio.gather(
+                self.system_monitor.get_system_info(),
+                self.service_controller.get_service_status(),
+                self.network_diagnostics.get_network_info()
+            )
             snapshot = {
                 "timestamp": datetime.now().isoformat(),
-                "system": await self.system_monitor.get_system_info(),
-                "services": await self.service_controller.get_service_status(),
-                "network": await self.network_diagnostics.get_network_info(),
-                "application": {
-                    "version": settings.version,
-                    "environment": settings.environment,
-                    "language": settings.language,
-                    "debug_mode": settings.debug
-                },
+                "system": system,
+                "services": services,
+                "network": network,
+                "application": _APPLICATION_INFO,
                 "active_sessions": len(self.active_sessions)
             }
             
@@ -489,5 +795,22 @@ class RemoteDebugger:
             return {"error": str(e), "timestamp": datetime.now().isoformat()}
 
 
+# Settings are frozen, so the application section is built once and shared
+_APPLICATION_INFO = {
+    "version": settings.version,
+    "environment": settings.environment,
+    "language": settings.language,
+    "debug_mode": settings.debug
+}
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write data to path via a temp file and rename, so readers never see a partial file"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
 # Global instance
 remote_debugger = RemoteDebugger()
\ No newline at end of file
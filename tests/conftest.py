@@ -0,0 +1,78 @@
+"""
+Shared fixtures for heyBuddy tests
+"""
+import asyncio
+import contextlib
+import sys
+from pathlib import Path
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from cryptography.fernet import Fernet
+
+try:
+    import uvloop
+except ImportError:  # e.g. Windows development machines
+    uvloop = None
+
+# Add src to path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.ai_client import AIClient
+from core.audio import AudioManager
+from database.local_db import LocalDatabase
+
+
+def pytest_asyncio_loop_factories(config, item):
+    """Run the suite on uvloop, like the application, when it is installed"""
+    if uvloop is not None:
+        return {"uvloop": uvloop.new_event_loop}
+    return {"asyncio": asyncio.new_event_loop}
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def http_session():
+    """HTTP session for API testing, shared so keep-alive connections are reused"""
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=32, keepalive_timeout=30)
+    session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=15)
+    )
+    # Open a pooled connection up front so the first timed test skips the handshake
+    with contextlib.suppress(aiohttp.ClientError, asyncio.TimeoutError):
+        async with session.get("http://localhost:8080/health", timeout=aiohttp.ClientTimeout(total=2)) as response:
+            await response.read()
+    yield session
+    await session.close()
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def ai_client():
+    """AI client shared by the session; tests use distinct user_ids"""
+    client = AIClient(language="de")
+    await client.initialize()
+    yield client
+    await client.cleanup()
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def audio_manager():
+    """Mock audio manager shared by the session"""
+    manager = AudioManager(device_type="mock")
+    await manager.initialize()
+    yield manager
+    await manager.cleanup()
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def database(tmp_path_factory):
+    """Throwaway database shared by the session; tests use distinct user_ids"""
+    # Temporary file and key so tests never touch the device's data/ directory
+    db = LocalDatabase(
+        f"sqlite:///{tmp_path_factory.mktemp('db') / 'heybuddy.db'}",
+        encryption_key=Fernet.generate_key().decode()
+    )
+    await db.initialize()
+    yield db
+    await db.cleanup()
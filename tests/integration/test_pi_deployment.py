@@ -5,61 +5,58 @@ Tests system integration, hardware interfaces, and production readiness
 import pytest
 import asyncio
 import aiohttp
+import gc
 import json
+import re
 import time
-from pathlib import Path
-import sys
-import os
 
-# Add src to path for testing
-sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+try:
+    import orjson  # optional: faster JSON decode
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+if __name__ == "__main__":
+    # Run as a script, where tests/conftest.py has not put src on the path
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
 
 from core.config import settings
 from core.ai_client import AIClient
-from core.audio import AudioManager
-from database.local_db import LocalDatabase
 from services.remote_debug import remote_debugger
 
+# Common German function words, matched as whole words
+_GERMAN_WORDS_RE = re.compile(r"\b(?:ich|du|ist|das|und|der|die)\b", re.IGNORECASE)
+# Story vocabulary stems, so inflected forms like "Hasen" or "mutige" also match
+_GERMAN_STORY_RE = re.compile(r"war|einmal|hase|mutig|kleine", re.IGNORECASE)
+
+
+# All tests share the session event loop, which the session-scoped fixtures live on
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+async def _read_json(response):
+    """Decode a JSON response body straight from bytes"""
+    return _loads(await response.read())
+
+
+async def _request_json(session, method, url, **kwargs):
+    """Issue one request and return (status, decoded JSON body)"""
+    async with session.request(method, url, **kwargs) as response:
+        return response.status, await _read_json(response)
+
 
 class TestPiDeployment:
     """Integration tests for Pi deployment"""
     
-    @pytest.fixture
-    async def ai_client(self):
-        """Initialize AI client for testing"""
-        client = AIClient(language="de")
-        await client.initialize()
-        yield client
-        await client.cleanup()
-    
-    @pytest.fixture
-    async def audio_manager(self):
-        """Initialize audio manager for testing"""
-        manager = AudioManager(device_type="mock")
-        await manager.initialize()
-        yield manager
-        await manager.cleanup()
-    
-    @pytest.fixture
-    async def database(self):
-        """Initialize database for testing"""
-        db = LocalDatabase()
-        await db.initialize()
-        yield db
-        await db.cleanup()
-    
-    @pytest.fixture
-    async def http_session(self):
-        """HTTP session for API testing"""
-        async with aiohttp.ClientSession() as session:
-            yield session
-    
+    @pytest.mark.xdist_group("http")
     async def test_health_endpoint(self, http_session):
         """Test basic health endpoint"""
         try:
             async with http_session.get("http://localhost:8080/health") as response:
                 assert response.status == 200
-                data = await response.json()
+                data = await _read_json(response)
                 assert "status" in data
                 assert data["status"] in ["healthy", "degraded"]
                 assert "version" in data
@@ -67,6 +64,7 @@ class TestPiDeployment:
         except aiohttp.ClientError:
             pytest.skip("Application not running - start with 'python src/main.py'")
     
+    @pytest.mark.xdist_group("http")
     async def test_german_conversation_api(self, http_session):
         """Test German conversation through API"""
         try:
@@ -81,20 +79,19 @@ class TestPiDeployment:
                 json=payload
             ) as response:
                 assert response.status == 200
-                data = await response.json()
+                data = await _read_json(response)
                 
                 assert data["success"] is True
                 assert "response" in data
                 assert len(data["response"]) > 0
                 
                 # Check for German response
-                german_words = ["ich", "du", "ist", "das", "und", "der", "die"]
-                response_text = data["response"].lower()
-                assert any(word in response_text for word in german_words), "Response should be in German"
+                assert _GERMAN_WORDS_RE.search(data["response"]), "Response should be in German"
                 
         except aiohttp.ClientError:
             pytest.skip("Application not running")
     
+    @pytest.mark.xdist_group("http")
     async def test_german_story_generation(self, http_session):
         """Test German story generation"""
         try:
@@ -109,24 +106,23 @@ class TestPiDeployment:
                 json=payload
             ) as response:
                 assert response.status == 200
-                data = await response.json()
+                data = await _read_json(response)
                 
                 assert data["success"] is True
                 assert "response" in data
                 assert len(data["response"]) > 50  # Should be a substantial story
                 
                 # Check for German story elements
-                story_text = data["response"].lower()
-                german_story_words = ["war", "einmal", "hase", "mutig", "kleine"]
-                assert any(word in story_text for word in german_story_words), "Story should be in German"
+                assert _GERMAN_STORY_RE.search(data["response"]), "Story should be in German"
                 
         except aiohttp.ClientError:
             pytest.skip("Application not running")
     
     async def test_audio_pipeline(self, audio_manager):
         """Test complete audio pipeline"""
-        # Test audio recording
-        audio_data = await audio_manager.record_audio(duration=1.0)
+        # Test audio recording; the mock returns at once, but playback below
+        # runs in real time, so keep the clip short
+        audio_data = await audio_manager.record_audio(duration=0.1)
         assert audio_data is not None
         assert len(audio_data) > 0
         
@@ -137,6 +133,7 @@ class TestPiDeployment:
         device_available = await audio_manager.is_device_available()
         assert device_available is True
     
+    @pytest.mark.xdist_group("ai")
     async def test_ai_conversation_flow(self, ai_client):
         """Test AI conversation with safety filters"""
         # Test safe German conversation
@@ -158,8 +155,9 @@ class TestPiDeployment:
         )
         
         assert result["success"] is False
-        assert "german_inappropriate" in result.get("error", "")
+        assert result["error"] == "german_inappropriate"
     
+    @pytest.mark.xdist_group("ai")
     async def test_emotional_support_detection(self, ai_client):
         """Test emotional support detection and response"""
         result = await ai_client.process_conversation(
@@ -175,21 +173,27 @@ class TestPiDeployment:
     
     async def test_database_operations(self, database):
         """Test database operations"""
-        # Test storing conversation
-        await database.store_conversation(
-            user_id="test_pi_db",
-            messages=[{"role": "user", "content": "Test"}],
-            metadata={"test": True}
-        )
+        # Stored conversations are queued and written together in one transaction
+        for i in range(5):
+            database.store_conversation(
+                user_id="test_pi_db",
+                user_message=f"Test {i}",
+                ai_response=f"Antwort {i}",
+                metadata={"topic": "test"}
+            )
+        await database.flush()
         
         # Test retrieving conversation
-        conversations = await database.get_user_conversations("test_pi_db")
-        assert len(conversations) > 0
+        conversations = database.get_conversation_history("test_pi_db", limit=5, decrypt=True)
+        assert len(conversations) == 5
+        assert {c["user_message"] for c in conversations} == {f"Test {i}" for i in range(5)}
         
         # Test conversation summary
-        summary = await database.get_conversation_summary("test_pi_db")
-        assert "message_count" in summary
+        summary = database.get_session_summary("test_pi_db")
+        assert summary["total_messages"] >= 5
+        assert "test" in summary["topics_discussed"]
     
+    @pytest.mark.xdist_group("http")
     async def test_websocket_connection(self, http_session):
         """Test WebSocket real-time updates"""
         try:
@@ -201,35 +205,36 @@ class TestPiDeployment:
         except aiohttp.ClientError:
             pytest.skip("WebSocket testing requires running application")
     
+    @pytest.mark.xdist_group("http")
     async def test_debug_system(self, http_session):
         """Test debug and monitoring system"""
         try:
+            # System info and service status are independent, so fetch them together
+            (status, data), (services_status, services) = await asyncio.gather(
+                _request_json(http_session, "GET", "http://localhost:8080/debug/system"),
+                _request_json(http_session, "GET", "http://localhost:8080/debug/services")
+            )
+            
             # Test system info endpoint
-            async with http_session.get("http://localhost:8080/debug/system") as response:
-                assert response.status == 200
-                data = await response.json()
-                
-                assert "cpu" in data
-                assert "memory" in data
-                assert "disk" in data
-                assert "timestamp" in data
-                
-                # Check CPU metrics
-                if "error" not in data["cpu"]:
-                    assert "usage_percent" in data["cpu"]
-                    assert data["cpu"]["usage_percent"] >= 0
-                
-                # Check memory metrics
-                if "error" not in data["memory"]:
-                    assert "total_gb" in data["memory"]
-                    assert data["memory"]["total_gb"] > 0
+            assert status == 200
+            assert "cpu" in data
+            assert "memory" in data
+            assert "disk" in data
+            assert "timestamp" in data
+            
+            # Check CPU metrics
+            if "error" not in data["cpu"]:
+                assert "usage_percent" in data["cpu"]
+                assert data["cpu"]["usage_percent"] >= 0
+            
+            # Check memory metrics
+            if "error" not in data["memory"]:
+                assert "total_gb" in data["memory"]
+                assert data["memory"]["total_gb"] > 0
             
             # Test service status
-            async with http_session.get("http://localhost:8080/debug/services") as response:
-                assert response.status == 200
-                data = await response.json()
-                
-                assert "application_health" in data
+            assert services_status == 200
+            assert "application_health" in services
                 
         except aiohttp.ClientError:
             pytest.skip("Debug endpoints not available")
@@ -288,6 +293,10 @@ class TestPiDeployment:
 class TestPiPerformance:
     """Performance testing for Pi hardware constraints"""
     
+    # Simultaneous conversations in test_concurrent_conversations
+    CONCURRENT_CONVERSATIONS = 8
+    
+    @pytest.mark.xdist_group("http")
     async def test_conversation_latency(self, http_session):
         """Test AI conversation response times"""
         try:
@@ -304,7 +313,7 @@ class TestPiPerformance:
                 json=payload
             ) as response:
                 assert response.status == 200
-                data = await response.json()
+                data = await _read_json(response)
                 
                 end_time = time.time()
                 latency = end_time - start_time
@@ -326,14 +335,17 @@ class TestPiPerformance:
         await ai_client.initialize()
         
         try:
-            for i in range(10):
-                await ai_client.process_conversation(
+            await asyncio.gather(*[
+                ai_client.process_conversation(
                     user_input=f"Test Nachricht {i}",
                     user_id="memory_test",
                     age=8
                 )
+                for i in range(10)
+            ])
             
-            # Check memory after load
+            # Check memory after load, without garbage waiting on a collection
+            gc.collect()
             final_info = await remote_debugger.system_monitor.get_system_info()
             final_memory = final_info.get("memory", {}).get("used_percent", 0)
             
@@ -343,35 +355,31 @@ class TestPiPerformance:
         finally:
             await ai_client.cleanup()
     
+    @pytest.mark.xdist_group("http")
     async def test_concurrent_conversations(self, http_session):
         """Test handling multiple simultaneous conversations"""
         try:
-            tasks = []
-            
-            for i in range(3):  # 3 concurrent conversations
-                payload = {
-                    "message": f"Hallo, ich bin Kind {i}",
-                    "user_id": f"concurrent_test_{i}",
-                    "age": 8
-                }
-                
-                task = http_session.post(
-                    "http://localhost:8080/conversation/text",
-                    json=payload
+            conversations = [
+                _request_json(
+                    http_session, "POST", "http://localhost:8080/conversation/text",
+                    json={
+                        "message": f"Hallo, ich bin Kind {i}",
+                        "user_id": f"concurrent_test_{i}",
+                        "age": 8
+                    }
                 )
-                tasks.append(task)
+                for i in range(self.CONCURRENT_CONVERSATIONS)
+            ]
             
             # Execute all requests concurrently
             start_time = time.time()
-            responses = await asyncio.gather(*[task.__aenter__() for task in tasks])
+            responses = await asyncio.gather(*conversations)
             end_time = time.time()
             
             # Check all responses succeeded
-            for response in responses:
-                assert response.status == 200
-                data = await response.json()
+            for status, data in responses:
+                assert status == 200
                 assert data["success"] is True
-                await response.__aexit__(None, None, None)
             
             # Should handle concurrent requests efficiently
             total_time = end_time - start_time
@@ -381,41 +389,40 @@ class TestPiPerformance:
             pytest.skip("Application not running")
 
 
-# Test fixtures and utilities
-@pytest.fixture(scope="session")
-def event_loop():
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
-
-
 if __name__ == "__main__":
     """Run tests directly for development"""
     import subprocess
     
     print("🧪 Running heyBuddy Pi Deployment Tests...")
     
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+    
     # Check if application is running
     try:
-        import requests
-        response = requests.get("http://localhost:8080/health", timeout=5)
-        if response.status_code == 200:
-            print("✅ Application is running")
-        else:
-            print("❌ Application health check failed")
-            exit(1)
-    except requests.exceptions.RequestException:
+        with urlopen("http://localhost:8080/health", timeout=5) as response:
+            status = response.status
+    except HTTPError as e:
+        status = e.code
+    except OSError:
         print("❌ Application not running. Start with: python src/main.py")
         exit(1)
     
+    if status == 200:
+        print("✅ Application is running")
+    else:
+        print("❌ Application health check failed")
+        exit(1)
+    
     # Run pytest
     result = subprocess.run([
         "python", "-m", "pytest", 
         __file__, 
         "-v", 
         "--tb=short",
-        "--asyncio-mode=auto"
+        # Tests sharing a session fixture stay on one worker (xdist_group)
+        "-n", "auto",
+        "--dist=loadgroup"
     ])
     
     exit(result.returncode)
\ No newline at end of file